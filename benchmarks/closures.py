@@ -0,0 +1,48 @@
+"""
+Times creating closures in a scope holding many variables,
+as map in example/functions.jim does for every element,
+and the memory they keep.
+
+Usage: python -O -m benchmarks.closures [closures] [variables]
+"""
+import sys
+import tracemalloc
+from time import perf_counter
+
+from jim import reader
+from jim.evaluator.evaluator import init_evaluator
+import jim.interpreter.evaluator as interpreter
+import jim.interpreter.jit as jit
+
+
+def main(argv):
+	n = int(argv[0]) if len(argv) > 0 else 5000
+	variables = int(argv[1]) if len(argv) > 1 else 200
+	jit.enabled = False
+	init_evaluator()
+	for i in range(variables):
+		interpreter.evaluate(next(reader.scan_forms(f"(def v{i} {i})")))
+
+	source = f"""
+		(def n 0) (def fs (list))
+		(loop (n fs)
+			(if (< n {n})
+				(*recur* (+ n 1) (conj fs (list (fn (x) (+ x n)))))
+				fs))"""
+	def run():
+		for form in reader.scan_forms(source):
+			result = interpreter.evaluate(form)
+		return result
+
+	start = perf_counter()
+	run()
+	elapsed = perf_counter() - start
+	tracemalloc.start()
+	result = run()
+	kept = tracemalloc.get_traced_memory()[0]
+	tracemalloc.stop()
+	print(f"{n} closures: {elapsed:.3f}s, {kept / 1e6:.1f} MB kept")
+
+
+if __name__ == "__main__":
+	main(sys.argv[1:])
@@ -0,0 +1,50 @@
+"""
+Runs the tree utilities over a list nested to the given depth,
+(a (a (a ... ))), reporting the time and peak memory of each.
+
+Usage: python -m benchmarks.deep [depth]
+"""
+import sys
+import tracemalloc
+from time import perf_counter
+
+from jim.objects import *
+from jim.objects import filter_tree, tree_equal, is_mutable
+from jim.checker.evaluator import resolve_form
+
+
+def nested(depth):
+	form = List([Symbol("a")])
+	for _ in range(depth - 1):
+		form = List([Symbol("a"), form])
+	return form
+
+
+def measure(label, run):
+	tracemalloc.start()
+	start = perf_counter()
+	run()
+	elapsed = perf_counter() - start
+	peak = tracemalloc.get_traced_memory()[1]
+	tracemalloc.stop()
+	print(f"{label:>12}: {elapsed:8.3f}s  {peak / 1e6:8.1f} MB peak")
+
+
+def main(argv):
+	depth = int(argv[0]) if argv else 10 ** 6
+	u, v = nested(depth), nested(depth)
+	context = {"a": Integer(1)}
+
+	measure("hash", lambda: hash(u))
+	measure("==", lambda: u == v)
+	measure("tree_equal", lambda: tree_equal(u, v))
+	measure("contains", lambda: Symbol("b") in u)
+	measure("is_mutable", lambda: is_mutable(u))
+	measure("repr", lambda: repr(u))
+	measure("str", lambda: str(u))
+	measure("filter_tree", lambda: filter_tree(lambda node: True, u))
+	measure("resolve_form", lambda: resolve_form(u, context))
+
+
+if __name__ == "__main__":
+	main(sys.argv[1:])
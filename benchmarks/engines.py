@@ -0,0 +1,78 @@
+"""
+Times the tree-walking evaluator against the bytecode engine,
+and against compiling hot functions to python,
+on a few compute-heavy programs, in process.
+
+Usage: python -O -m benchmarks.engines [iterations]
+"""
+import io
+import sys
+from contextlib import redirect_stdout
+from time import perf_counter
+
+from jim import reader
+from jim.evaluator.evaluator import init_evaluator
+import jim.interpreter.evaluator as interpreter
+import jim.interpreter.jit as jit
+
+
+PROGRAMS = {
+	"count": """
+		(def n 0) (def total 0)
+		(loop (n total)
+			(if (< n {n})
+				(*recur* (+ n 1) (+ total (% n 7)))
+				total))""",
+	"calls": """
+		(def sq (fn (x) (* x x)))
+		(def n 0) (def total 0)
+		(loop (n total)
+			(if (< n {n})
+				(*recur* (+ n 1) (+ total (sq n)))
+				total))""",
+	"fizzbuzz": """
+		(def n 0)
+		(loop (n)
+			(if (< n {n})
+				(progn
+					(print
+						(if (= 0 (% n 15)) "FizzBuzz"
+						(if (= 0 (% n 3)) "Fizz"
+						(if (= 0 (% n 5)) "Buzz" n))))
+					(*recur* (+ n 1)))))""",
+	"fib": """
+		(def fib (fn (n) (if (< n 2) n (+ (*recur* (- n 1)) (*recur* (- n 2))))))
+		(def n 0) (def total 0)
+		(loop (n total)
+			(if (< n {n})
+				(*recur* (+ n 1) (+ total (fib 6)))
+				total))""",
+}
+
+
+def run(engine, source, compiled=False):
+	interpreter.engine = engine
+	jit.enabled = compiled
+	init_evaluator()
+	start = perf_counter()
+	with redirect_stdout(io.StringIO()):
+		for form in reader.scan_forms(source):
+			result = interpreter.evaluate(form)
+	return perf_counter() - start, result
+
+
+def main(argv):
+	n = int(argv[0]) if argv else 5000
+	for name, template in PROGRAMS.items():
+		source = template.replace("{n}", str(n))
+		tree, expected = run("tree", source)
+		vm, result = run("vm", source)
+		assert result == expected
+		compiled, result = run("tree", source, compiled=True)
+		assert result == expected
+		print(f"{name:>10}: tree {tree:8.3f}s  vm {vm:8.3f}s  ({tree / vm:.1f}x)"
+		      f"  jit {compiled:8.3f}s  ({tree / compiled:.1f}x)")
+
+
+if __name__ == "__main__":
+	main(sys.argv[1:])
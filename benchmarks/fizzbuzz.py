@@ -0,0 +1,42 @@
+"""
+Times example/fizzbuzz.jim, counting up to the given limits,
+with debug output on (JIM_DEBUG=1) and off.
+Each run is a separate process, since the level is read at startup.
+
+Usage: python -m benchmarks.fizzbuzz [limits...]
+"""
+import os
+import sys
+import subprocess
+import tempfile
+from time import perf_counter
+
+
+EXAMPLE = os.path.join(os.path.dirname(__file__), "..", "example", "fizzbuzz.jim")
+
+
+def measure(mode, path, level):
+	env = dict(os.environ, JIM_DEBUG=str(level))
+	start = perf_counter()
+	subprocess.run([sys.executable, "-m", "jim", mode, "--no-cache", path],
+			env=env, check=True,
+			stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+	return perf_counter() - start
+
+
+def main(argv):
+	limits = [int(n) for n in argv] or [100, 1000]
+	with open(EXAMPLE) as f:
+		source = f.read()
+	for n in limits:
+		with tempfile.NamedTemporaryFile("w", suffix=".jim") as f:
+			f.write(source.replace("(< n 100)", f"(< n {n})"))
+			f.flush()
+			for mode in ["run", "check"]:
+				on = measure(mode, f.name, 1)
+				off = measure(mode, f.name, 0)
+				print(f"{mode:>5} {n:>6}: {on:8.3f}s debug on, {off:8.3f}s off")
+
+
+if __name__ == "__main__":
+	main(sys.argv[1:])
@@ -0,0 +1,69 @@
+"""
+Counts the frames the tree-walking evaluator pushes per loop iteration,
+and how many of them build an immediate form, with and without
+evaluating atoms and symbols in place; then times both.
+
+Usage: python -O -m benchmarks.frames [iterations]
+"""
+import sys
+from time import perf_counter
+
+from jim import reader
+import jim.evaluator.evaluator as evaluator
+import jim.interpreter.evaluator as interpreter
+import jim.interpreter.jit as jit
+import jim.tracer as tracer
+
+
+SOURCE = """
+	(def sq (fn (x) (* x x)))
+	(def n 0) (def total 0)
+	(loop (n total)
+		(if (< n {n})
+			(*recur* (+ n 1) (+ total (sq n) (% n 7)))
+			total))"""
+
+
+def run(n):
+	evaluator.stack.clear()
+	evaluator.init_evaluator()
+	for form in reader.scan_forms(SOURCE.replace("{n}", str(n))):
+		interpreter.evaluate(form)
+
+
+def main(argv):
+	n = int(argv[0]) if argv else 20000
+	jit.enabled = False
+	frame = evaluator.Stackframe
+	print(f"{'':>8} {'frames':>8} {'immediate':>10} {'time':>10}")
+	for name, inline in (("before", False), ("after", True)):
+		frame.inline_leaves = inline
+		frame.keeps_immediate_form = not inline
+
+		# Counts the pushes in the trace, and the calls (each building
+		# an immediate form if kept) by wrapping evaluate_call_form.
+		calls = 0
+		evaluate_call_form = frame.evaluate_call_form
+		def counted(self):
+			nonlocal calls
+			calls += 1
+			return (yield from evaluate_call_form(self))
+		frame.evaluate_call_form = counted
+		tracer.enable()
+		run(100)
+		pushes = sum(e[1] == tracer.PUSH for e in tracer.events)
+		tracer.disable()
+		frame.evaluate_call_form = evaluate_call_form
+		immediate = calls if frame.keeps_immediate_form else 0
+
+		start = perf_counter()
+		run(n)
+		elapsed = perf_counter() - start
+		print(f"{name:>8} {pushes / 100:>8.1f} {immediate / 100:>10.1f}"
+				f" {elapsed:>9.3f}s")
+	frame.inline_leaves = True
+	frame.keeps_immediate_form = False
+
+
+if __name__ == "__main__":
+	main(sys.argv[1:])
@@ -0,0 +1,48 @@
+"""
+Times the list operations behind rest, conj and assoc, used the way recursive
+code uses them: walking a list with rest, building one up with conj,
+and changing every element in turn with assoc.
+With persistent lists the time per element should stay flat as lists grow;
+copying on every operation (as lists used to) grows linearly instead.
+
+Usage: python -m benchmarks.lists [lengths...]
+"""
+import sys
+from time import perf_counter
+
+from jim.objects import List, Integer
+
+
+def persistent(n):
+	lst = List()
+	for i in range(n):
+		lst = lst + List([Integer(i)])
+	for i in range(n):
+		lst = lst.assoc(i, Integer(-i))
+	while len(lst) > 0:
+		lst = lst[1:]
+
+
+def copying(n):
+	lst = []
+	for i in range(n):
+		lst = lst + [Integer(i)]
+	for i in range(n):
+		lst = [*lst[:i], Integer(-i), *lst[i + 1:]]
+	while len(lst) > 0:
+		lst = lst[1:]
+
+
+def main(argv):
+	lengths = [int(n) for n in argv] or [1000, 4000, 16000]
+	for n in lengths:
+		for label, run in [("persistent", persistent), ("copying", copying)]:
+			start = perf_counter()
+			run(n)
+			elapsed = perf_counter() - start
+			print(f"{n:>8} {label:>10}: {elapsed:8.3f}s"
+					f"  ({elapsed / n * 1e6:.1f} us per element)")
+
+
+if __name__ == "__main__":
+	main(sys.argv[1:])
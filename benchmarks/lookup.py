@@ -0,0 +1,38 @@
+"""
+Times name lookups in a function created inside nested scopes,
+where the builtins it uses are several maps down the context chain.
+
+Usage: python -O -m benchmarks.lookup [iterations]
+"""
+import sys
+from time import perf_counter
+
+from jim import reader
+from jim.evaluator.evaluator import init_evaluator
+import jim.interpreter.evaluator as interpreter
+import jim.interpreter.jit as jit
+
+
+SOURCE = """
+	(def f (let (a 1) (let (b 2) (let (c 3) (let (d 4)
+		(fn (x) (let (y (+ x a)) (if (< y b) (+ y c) (- y d)))))))))
+	(def n 0) (def total 0)
+	(loop (n total)
+		(if (< n {n})
+			(*recur* (+ n 1) (+ total (f n)))
+			total))"""
+
+
+def main(argv):
+	n = int(argv[0]) if argv else 20000
+	# Only the interpreter does lookups.
+	jit.enabled = False
+	init_evaluator()
+	start = perf_counter()
+	for form in reader.scan_forms(SOURCE.replace("{n}", str(n))):
+		interpreter.evaluate(form)
+	print(f"{n} calls: {perf_counter() - start:.3f}s")
+
+
+if __name__ == "__main__":
+	main(sys.argv[1:])
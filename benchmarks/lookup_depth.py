@@ -0,0 +1,63 @@
+"""
+Times the lookups in a loop body nested in more and more scopes,
+under both engines. Each is timed with and without the lookups,
+and only the difference is shown, leaving out the cost of the lets themselves.
+The bytecode engine caches where each name was found,
+so its lookups stay as fast as the builtins get further away,
+while the tree engine walks every scope each time.
+
+Usage: python -O -m benchmarks.lookup_depth [iterations]
+"""
+import sys
+from time import perf_counter
+
+from jim import reader
+from jim.evaluator.evaluator import init_evaluator
+import jim.interpreter.evaluator as interpreter
+import jim.interpreter.jit as jit
+
+
+LOOP = """
+	(let (n 0 total 0)
+		(loop (n total)
+			(if (< n {n})
+				(*recur* (+ n 1) {body})
+				total)))"""
+
+# Lookups of builtins and loop variables, which are found past all the lets.
+TERMS = ["(% n 7)", "(* n 2)", "(- n 1)", "(+ n total)"] * 64
+
+
+def nested(depth, n, terms):
+	body = f"(+ total {' '.join(terms)})" if terms else "total"
+	for i in range(depth):
+		body = f"(let (v{i} {i}) {body})"
+	return LOOP.replace("{n}", str(n)).replace("{body}", body)
+
+
+def timed(source, repeat=3):
+	"""The best of a few runs, since two are subtracted."""
+	[form] = reader.scan_forms(source)
+	times = []
+	for _ in range(repeat):
+		start = perf_counter()
+		interpreter.evaluate(form)
+		times.append(perf_counter() - start)
+	return min(times)
+
+
+def main(argv):
+	n = int(argv[0]) if argv else 5000
+	jit.enabled = False
+	init_evaluator()
+	print(f"{'depth':>8} {'tree':>10} {'vm':>10}")
+	for depth in (0, 4, 16, 64):
+		times = []
+		for engine in ("tree", "vm"):
+			interpreter.engine = engine
+			times.append(timed(nested(depth, n, TERMS)) - timed(nested(depth, n, [])))
+		print(f"{depth:>8} " + " ".join(f"{t:>9.3f}s" for t in times))
+
+
+if __name__ == "__main__":
+	main(sys.argv[1:])
@@ -0,0 +1,63 @@
+"""
+Looks up every key of a table of n entries, once in a list of key-value pairs
+scanned with a recursive function, and once in a map.
+
+Usage: python -O -m benchmarks.maps [sizes...]
+"""
+import sys
+from time import perf_counter
+
+from jim import reader
+from jim.evaluator.evaluator import init_evaluator
+from jim.interpreter.evaluator import evaluate
+
+
+PRELUDE = """
+(def lookup (fn (pairs key)
+	(if (= (get (get pairs 0) 0) key)
+		(get (get pairs 0) 1)
+		(*recur* (rest pairs) key))))
+
+(def lookup-all (fn (table find keys (total 0))
+	(if (> (len keys) 0)
+		(*recur* table find (rest keys) (+ total (find table (get keys 0))))
+		total)))
+"""
+
+SETUP = """
+(def pairs (list {pairs}))
+(def table (hash-map {entries}))
+(def keys (list {keys}))
+"""
+
+PROGRAMS = [
+	("pairs", "(lookup-all pairs lookup keys)"),
+	("map", "(lookup-all table get keys)")]
+
+
+def run(source):
+	result = None
+	for form in reader.scan_forms(source):
+		result = evaluate(form)
+	return result
+
+
+def main(argv):
+	sizes = [int(n) for n in argv] or [50, 100, 200]
+	init_evaluator()
+	run(PRELUDE)
+	for n in sizes:
+		run(SETUP.format(
+				pairs=" ".join(f"(list {i} {i * i})" for i in range(n)),
+				entries=" ".join(f"{i} {i * i}" for i in range(n)),
+				keys=" ".join(map(str, range(n)))))
+		for label, program in PROGRAMS:
+			start = perf_counter()
+			result = run(program)
+			elapsed = perf_counter() - start
+			assert result.value == sum(i * i for i in range(n))
+			print(f"{n:>8} {label:>6}: {elapsed:8.3f}s")
+
+
+if __name__ == "__main__":
+	main(sys.argv[1:])
@@ -0,0 +1,48 @@
+"""
+Measures the memory held by the parsed forms of a large program,
+per node of the form trees.
+
+Usage: python -m benchmarks.memory [number of top-level forms]
+"""
+import sys
+import tracemalloc
+
+from jim import reader
+from jim.objects import List
+from benchmarks.reader import generate_source
+
+
+def count_nodes(forms):
+	count = 0
+	pending = list(forms)
+	while pending:
+		form = pending.pop()
+		count += 1
+		if isinstance(form, List):
+			pending.extend(form)
+	return count
+
+
+def measure(label, source, **options):
+	tracemalloc.start()
+	before = tracemalloc.get_traced_memory()[0]
+	forms = list(reader.scan_forms(source, **options))
+	held = tracemalloc.get_traced_memory()[0] - before
+	tracemalloc.stop()
+
+	nodes = count_nodes(forms)
+	print(f"{label:>8}: {nodes} nodes in {held / 1e6:.1f} MB:"
+			f" {held / nodes:.1f} bytes per node")
+
+
+def main(argv):
+	n = int(argv[0]) if argv else 20000
+	source = generate_source(n)
+	measure("plain", source)
+	measure("shared", source, share=True)
+	# The same few functions over and over, as in generated code.
+	measure("repeated", generate_source(100) * (n // 100), share=True)
+
+
+if __name__ == "__main__":
+	main(sys.argv[1:])
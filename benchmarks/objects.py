@@ -0,0 +1,60 @@
+"""
+Counts how many Integer and Symbol objects a fizzbuzz-style loop asks for,
+and how many of them actually had to be allocated.
+
+Usage: python -O -m benchmarks.objects [iterations]
+"""
+import sys
+from time import perf_counter
+
+from jim import reader
+from jim.objects import Integer, Symbol
+from jim.evaluator.evaluator import init_evaluator
+from jim.interpreter.evaluator import evaluate
+
+
+PROGRAM = """
+(def n 0)
+(def hits 0)
+(loop (n hits)
+	(if (< n {iterations})
+		(progn
+			(if (= 0 (% n 15)) (def hits (+ hits 1))
+			(if (= 0 (% n 3)) (def hits (+ hits 1))
+			(if (= 0 (% n 5)) (def hits (+ hits 1)))))
+			(*recur* (+ n 1) hits))))
+"""
+
+
+def count_constructions(cls, is_shared):
+	"""Wraps cls.__new__ to count calls, and calls answered by a shared object."""
+	counts = {"calls": 0, "shared": 0}
+	original = cls.__new__
+	def counting_new(cls, value):
+		counts["calls"] += 1
+		if is_shared(value):
+			counts["shared"] += 1
+		return original(cls, value)
+	cls.__new__ = counting_new
+	return counts
+
+
+def main(argv):
+	iterations = int(argv[0]) if argv else 5000
+	integers = count_constructions(Integer, lambda v: v in Integer._small)
+	symbols = count_constructions(Symbol, lambda v: v in Symbol._interned)
+
+	init_evaluator()
+	start = perf_counter()
+	for form in reader.scan_forms(PROGRAM.format(iterations=iterations)):
+		evaluate(form)
+	elapsed = perf_counter() - start
+
+	print(f"{iterations} iterations in {elapsed:.3f}s")
+	for name, counts in [("Integer", integers), ("Symbol", symbols)]:
+		allocated = counts["calls"] - counts["shared"]
+		print(f"{name:>8}: {counts['calls']:8} constructed, {allocated:8} allocated")
+
+
+if __name__ == "__main__":
+	main(sys.argv[1:])
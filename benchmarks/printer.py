@@ -0,0 +1,32 @@
+"""
+Compares the peak memory of printing a large nested list
+by building its repr first against streaming it with the printer.
+
+Usage: python -m benchmarks.printer [number of elements]
+"""
+import os
+import sys
+import tracemalloc
+
+from jim.objects import *
+from jim.printer import write_form
+
+
+def measure(label, run):
+	tracemalloc.start()
+	run()
+	peak = tracemalloc.get_traced_memory()[1]
+	tracemalloc.stop()
+	print(f"{label:>8}: {peak / 1e6:8.1f} MB peak")
+
+
+def main(argv):
+	n = int(argv[0]) if argv else 100000
+	form = List(List([Symbol("x"), Integer(i), String("s")]) for i in range(n))
+	with open(os.devnull, "w") as out:
+		measure("repr", lambda: print(repr(form), file=out))
+		measure("printer", lambda: write_form(form, out, repr))
+
+
+if __name__ == "__main__":
+	main(sys.argv[1:])
@@ -0,0 +1,49 @@
+"""
+Sorts arrays of growing length in place with the functions of example/quicksort.jim.
+
+Usage: python -O -m benchmarks.quicksort [lengths...]
+"""
+import os
+import sys
+import math
+import random
+from time import perf_counter
+
+from jim import reader
+from jim.objects import List, Symbol, MutableList, Integer
+from jim.evaluator.evaluator import init_evaluator
+from jim.interpreter.evaluator import evaluate
+
+
+EXAMPLE = os.path.join(os.path.dirname(__file__), "..", "example", "quicksort.jim")
+
+
+def load_definitions():
+	"""Evaluates the function definitions of the example, skipping the demo."""
+	with open(EXAMPLE) as f:
+		for form in reader.scan_forms(f.read()):
+			if form.head is Symbol("def") and isinstance(form[2], List)  \
+					and form[2].head is Symbol("fn"):
+				evaluate(form)
+
+
+def main(argv):
+	lengths = [int(n) for n in argv] or [250, 500, 1000, 2000]
+	init_evaluator()
+	load_definitions()
+	sort, = reader.scan_forms("(quicksort A 0 (- (len A) 1))")
+	for n in lengths:
+		values = random.Random(n).sample(range(n * 10), n)
+		array = MutableList(map(Integer, values))
+		evaluate(List([Symbol("def"), Symbol("A"), array]))
+
+		start = perf_counter()
+		evaluate(sort)
+		elapsed = perf_counter() - start
+		assert [i.value for i in array] == sorted(values)
+		print(f"{n:>8}: {elapsed:8.3f}s"
+				f"  ({elapsed / (n * math.log2(n)) * 1e6:.1f} us per n log n)")
+
+
+if __name__ == "__main__":
+	main(sys.argv[1:])
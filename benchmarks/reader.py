@@ -0,0 +1,43 @@
+"""
+Compares the streaming Reader, the scan_forms backend (eager and lazy)
+and parallel_scan_forms on a large input.
+
+Usage: python -m benchmarks.reader [number of top-level forms]
+"""
+import sys
+from time import perf_counter
+
+from jim import reader
+
+
+def generate_source(n):
+	unit = (
+		'(def f{i} (fn (x (ys))\n'
+		'\t; some commentary\n'
+		'\t(if (< x {i}) (+ x -{i} "a \\"quoted\\" string") (conj ys (list x sym-{i})))))\n')
+	return "".join(unit.format(i=i) for i in range(n))
+
+
+def timed(label, load):
+	start = perf_counter()
+	forms = list(load())
+	elapsed = perf_counter() - start
+	print(f"{label:>8}: {elapsed:8.3f}s  ({len(forms)} forms)")
+	return forms
+
+
+def main(argv):
+	n = int(argv[0]) if argv else 20000
+	source = generate_source(n)
+	print(f"source: {len(source) / 1e6:.1f} MB")
+
+	streamed = timed("stream", lambda: reader.load_forms(reader.string_source(source)))
+	scanned = timed("scan", lambda: reader.scan_forms(source))
+	timed("bytes", lambda: reader.scan_forms(source.encode()))
+	parallel = timed("parallel", lambda: reader.parallel_scan_forms(source, threshold=0))
+	lazy = timed("lazy", lambda: reader.scan_forms(source, lazy=True))
+	assert streamed == scanned == parallel == lazy
+
+
+if __name__ == "__main__":
+	main(sys.argv[1:])
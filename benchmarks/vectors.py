@@ -0,0 +1,49 @@
+"""
+Sums the squares of 0 to n - 1, once with a recursive function over a list
+and once with the integer vector builtins.
+
+Usage: python -O -m benchmarks.vectors [lengths...]
+"""
+import sys
+from time import perf_counter
+
+from jim import reader
+from jim.evaluator.evaluator import init_evaluator
+from jim.interpreter.evaluator import evaluate
+
+
+PRELUDE = """
+(def sum-squares (fn (lst (total 0))
+	(if (> (len lst) 0)
+		(*recur* (rest lst) (+ total (* (get lst 0) (get lst 0))))
+		total)))
+"""
+
+PROGRAMS = [
+	("recursive", "(sum-squares (apply list (range {n})))"),
+	("vector", "(dot (range {n}) (range {n}))")]
+
+
+def run(source):
+	result = None
+	for form in reader.scan_forms(source):
+		result = evaluate(form)
+	return result
+
+
+def main(argv):
+	lengths = [int(n) for n in argv] or [1000, 4000]
+	init_evaluator()
+	run(PRELUDE)
+	for n in lengths:
+		expected = sum(i * i for i in range(n))
+		for label, program in PROGRAMS:
+			start = perf_counter()
+			result = run(program.format(n=n))
+			elapsed = perf_counter() - start
+			assert result.value == expected
+			print(f"{n:>8} {label:>9}: {elapsed:8.3f}s")
+
+
+if __name__ == "__main__":
+	main(sys.argv[1:])
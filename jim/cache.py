@@ -0,0 +1,173 @@
+"""
+On-disk cache of parsed top-level forms, in the spirit of __pycache__.
+
+The forms of a source file are stored in a __jimcache__ directory next to it,
+together with the modification time, size, and a hash of the content.
+A cache entry is used when the modification time and size still match,
+or otherwise when the content hash does.
+"""
+import io
+import os
+import marshal
+import hashlib
+
+from jim import reader
+from jim.objects import *
+
+
+CACHE_DIR = "__jimcache__"
+_SUFFIX = ".jimc"
+_MAGIC = b"JIMC\x02"
+
+# Cleared by the --no-cache option.
+enabled = True
+# Number of processes used to parse large files on a cache miss,
+# set by the --parallel option.
+parallel = None
+# Set by the --lazy option. Lazily parsed forms are not cached:
+# they come from the source text, and caching would parse them in full.
+lazy = False
+
+
+def cache_path(path):
+	directory, name = os.path.split(os.path.abspath(path))
+	return os.path.join(directory, CACHE_DIR, name + _SUFFIX)
+
+
+def _digest(content):
+	return hashlib.blake2b(content, digest_size=16).digest()
+
+
+# Forms are encoded into nested marshal-able values:
+# a List is a tuple, an Integer an int, a Symbol a str,
+# and a String its UTF-8 bytes (to tell it apart from Symbol).
+# None (left by a top-level comment) stays as is.
+
+def _encode(form):
+	match form:
+		case List():
+			return tuple(map(_encode, form))
+		case Integer(value=v):
+			return v
+		case Symbol(value=v):
+			return v
+		case String(value=v):
+			return v.encode("utf-8")
+		case None:
+			return None
+		case _:
+			raise TypeError(f"Cannot cache {form!r}.")
+
+
+def _decode(data):
+	return _decoders[type(data)](data)
+
+_decoders = {
+	tuple: lambda data: List([_decode(d) for d in data]),
+	int: Integer,
+	str: Symbol,
+	bytes: lambda data: String(data.decode("utf-8")),
+	type(None): lambda data: None}
+
+
+def _read_entry(path, stat):
+	"""
+	Returns the encoded forms if the cache entry for path is fresh, otherwise None.
+	"""
+	try:
+		with open(cache_path(path), "rb") as f:
+			if f.read(len(_MAGIC)) != _MAGIC:
+				return None
+			mtime, size, digest, forms = marshal.load(f)
+	except (OSError, EOFError, ValueError, TypeError):
+		return None
+
+	if size != stat.st_size:
+		return None
+	if mtime != stat.st_mtime_ns:
+		# Touched but possibly unchanged; fall back to the content hash.
+		try:
+			with open(path, "rb") as f:
+				if _digest(f.read()) != digest:
+					return None
+		except OSError:
+			return None
+		_write_entry(path, stat, digest, forms)
+	return forms
+
+
+def _write_entry(path, stat, digest, encoded_forms):
+	target = cache_path(path)
+	temp = f"{target}.{os.getpid()}.tmp"
+	try:
+		data = marshal.dumps((stat.st_mtime_ns, stat.st_size, digest,
+				tuple(encoded_forms)))
+		os.makedirs(os.path.dirname(target), exist_ok=True)
+		with open(temp, "wb") as f:
+			f.write(_MAGIC)
+			f.write(data)
+		os.replace(temp, target)
+	except (OSError, ValueError, RecursionError):
+		# Caching is best-effort: unwritable directories and forms nested
+		# too deeply to encode simply go uncached.
+		pass
+
+
+def load_forms(path):
+	"""
+	Produces the top-level forms of the file at path,
+	from the cache if possible.
+	Otherwise the file is parsed as the forms are consumed,
+	and the forms are cached once the whole file has been parsed successfully.
+	"""
+	stat = os.stat(path)
+	use_cache = enabled and not lazy
+	if use_cache:
+		cached = _read_entry(path, stat)
+		if cached is not None:
+			yield from map(_decode, cached)
+			return
+
+	with open(path, "rb") as f:
+		content = f.read()
+	# Decoded the same way as open(path) would.
+	text = io.TextIOWrapper(io.BytesIO(content)).read()
+	forms = []
+	if parallel is None:
+		parsed = reader.scan_forms(text, lazy=lazy)
+	else:
+		parsed = reader.parallel_scan_forms(text, workers=parallel, lazy=lazy)
+	for form in parsed:
+		forms.append(form)
+		yield form
+	if use_cache:
+		_write_entry(path, stat, _digest(content), map(_encode, forms))
+
+
+def _is_stale(cache_file):
+	directory, name = os.path.split(cache_file)
+	source = os.path.join(os.path.dirname(directory), name[:-len(_SUFFIX)])
+	try:
+		return _read_entry(source, os.stat(source)) is None
+	except OSError:
+		return True
+
+
+def prune(root=".", everything=False):
+	"""
+	Removes cache entries under root whose source file is gone or has changed,
+	or all cache entries if everything is set.
+	Returns the paths removed.
+	"""
+	removed = []
+	for directory, subdirs, files in os.walk(root):
+		if os.path.basename(directory) != CACHE_DIR:
+			continue
+		for name in files:
+			cache_file = os.path.join(directory, name)
+			if everything or not name.endswith(_SUFFIX) or _is_stale(cache_file):
+				os.remove(cache_file)
+				removed.append(cache_file)
+		if len(os.listdir(directory)) == 0:
+			os.rmdir(directory)
+	return removed
@@ -93,7 +93,10 @@ def delegate_concrete_to(name):
 # Omitted builtins either should not or do not need to be delegated.
 _delegated_symbols = {
 	"number?", "list?", "get", "rest", "conj", "assoc", "len",
-	"+", "-", "*", "/", "%"}
+	"+", "-", "*", "/", "%",
+	"hash-map", "map?", "dissoc", "keys",
+	"ivec", "range", "sum", "dot",
+	"v+", "v-", "v*", "v/", "v%", "v<", "v>", "v<=", "v>=", "v="}
 # Common executions that do not need to go through delegation wrapping.
 _pure_commons = {"=", "<", ">", "<=", ">=", "and", "or", "not"}
 # Implication cannot be pure (for now) because
@@ -116,6 +119,22 @@ for name in _pure_commons:
 	pure(type(common.builtin_symbols[name]))
 
 
+# Not pure, but still needs to handle unknowns.
+@builtin_symbol("assoc!")
+@delegate_concrete_to("assoc!")
+class _MutatingAssociate:
+	def evaluate(self, context, lst, idx, val):
+		if not objects.is_known(lst):
+			return UnknownValue()
+		if not objects.is_known(idx) and isinstance(lst, MutableList):
+			# Any of the elements could have been replaced.
+			for i in range(len(lst)):
+				lst[i] = UnknownValue()
+			return lst
+		return (yield from common.builtin_symbols["assoc!"].evaluate(
+				context, lst=lst, idx=idx, val=val))
+
+
 ################################################################################
 
 
@@ -248,6 +267,32 @@ def _make_truths(conditions, context, mask=None):
 		yield from checker.mark_as_true(condition, masked_context)
 
 
+def _forget_mutable(values):
+	"""
+	Makes unknown the elements of the mutable lists reachable from the values,
+	which a call given them could have changed.
+	Closures are followed into the variables their bodies refer to.
+	"""
+	pending = list(values)
+	seen = set()
+	while pending:
+		value = pending.pop()
+		if id(value) in seen or not objects.is_mutable(value):
+			continue
+		seen.add(id(value))
+		if isinstance(value, MutableList):
+			pending.extend(value)
+			for i in range(len(value)):
+				value[i] = UnknownValue()
+		elif isinstance(value, Map):
+			pending.extend(value.values())
+		elif isinstance(value, common.UserExecution.Instance):
+			pending.extend(value.closure[name]
+					for name in common._symbol_names(value.body) if name in value.closure)
+		elif isinstance(value, List):
+			pending.extend(value)
+
+
 class UserExecution(common.UserExecution):
 	class Instance(common.UserExecution.Instance):
 		def __init__(self, parameter_spec, body, closure):
@@ -279,6 +324,7 @@ class UserFunction(UserExecution):
 		def evaluate(self, calling_context, **locals):
 			# Check pre-conditions on actual arguments.
 			debug("fn check pre-conditions:", self.pre_conditions)
+			arguments = list(locals.values())
 			context = self.closure.new_child(locals)
 			yield from self.check_preconds(context)
 
@@ -299,6 +345,11 @@ class UserFunction(UserExecution):
 				yield
 				result = f.result
 
+			# The body was checked with the arguments masked,
+			# and is not checked again once verified:
+			# any list it can reach could have been changed.
+			_forget_mutable([self, *arguments])
+
 			# Successful evaluation implies post-conditions are satisfied.
 			context["*recur*"] = self
 			context["*result*"] = result
@@ -366,6 +417,9 @@ class Loop(UserExecution):
 				for name in self.parameter_spec:
 					calling_context[name] = body_context[name]
 
+			# Later iterations are not checked, but could change the lists in reach.
+			_forget_mutable([self])
+
 			context = calling_context.new_child({"*result*": result, "*recur*": self})
 			for condition in self.post_conditions:
 				yield from checker.assert_evaluate(condition, true, context)
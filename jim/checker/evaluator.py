@@ -1,4 +1,6 @@
 from collections import ChainMap, UserDict
+import jim.debug
+import jim.tracer as tracer
 from jim.debug import trace_entry, debug
 
 import jim.checker.builtin as builtin
@@ -11,6 +13,11 @@ from jim.objects import *
 
 
 class Stackframe(evaluator.Stackframe):
+	# Every form needs its own frame to be checked.
+	tail_calls = False
+	inline_leaves = False
+	keeps_immediate_form = True
+
 	@trace_entry
 	def evaluate_frame(self):
 		# If a value is present before we start, we are given an assumption.
@@ -54,6 +61,8 @@ def resolve_form(form, context):
 	Resolves a form by looking up all names in the provided context.
 	Returns the equivalent context-indepentent form,
 	or None if the form is too complex to be resolved.
+	Forms involving mutable values are not resolved,
+	since the same form can evaluate differently after a mutation.
 	"""
 	# TODO Resolving fn forms is possible with intermediate "closure objects".
 	# These form introduce bindings and makes for a complicated analysis
@@ -62,27 +71,46 @@ def resolve_form(form, context):
 	banned_targets = {None, *map(builtin.builtin_symbols.get,
 			["fn", "loop", "def", "let", "postcond"])}
 
-	match form:
-		case Symbol(value=name):
-			return context[name]
+	if not isinstance(form, List) or len(form) == 0:
+		return _resolve_simple_form(form, context)
+
+	# The elements of each list being resolved still to go,
+	# and those resolved so far; innermost last.
+	pending = [(iter(form), [])]
+	while True:
+		elements, resolved = pending[-1]
+		for element in elements:
+			if isinstance(element, List) and len(element) > 0:
+				pending.append((iter(element), []))
+				break
+			element = _resolve_simple_form(element, context)
+			# Stops at the first unresolvable element:
+			# later ones may use names it was to define.
+			if element is None or len(resolved) == 0 and element in banned_targets:
+				return None
+			resolved.append(element)
+		else:
+			pending.pop()
+			lst = List.shared(resolved)
+			if len(pending) == 0:
+				return lst
+			resolved = pending[-1][1]
+			if len(resolved) == 0 and lst in banned_targets:
+				return None
+			resolved.append(lst)
 
-		case Atom():
-			return form
 
-		case List():
-			if len(form) == 0:
-				return form
+def _resolve_simple_form(form, context):
+	match form:
+		case Symbol(value=name):
+			value = context[name]
+			return None if objects.is_mutable(value) else value
 
-			target, *args = form
+		case MutableList():
+			return None
 
-			target = resolve_form(target, context)
-			if target in banned_targets:
-				return None
-			else:
-				args = [resolve_form(arg, context) for arg in args]
-				if any(map(lambda arg: arg is None, args)):
-					return None
-				return List([target, *args])
+		case Atom() | IntVector() | Map() | List():
+			return form
 
 
 def update_vmap(form, value, context=None):
@@ -92,11 +120,15 @@ def update_vmap(form, value, context=None):
 	If the form already has a known value,
 	then the new value must equal to that value.
 	"""
-	debug(f"CALL: update_vmap({form}, {value})")
+	if jim.debug.level:
+		debug(f"CALL: update_vmap({form}, {value})")
 	# Assume the provided form to be resolved if no context was given.
 	resolved_form = resolve_form(form, context) if context is not None else form
-	if resolved_form is None:
+	if resolved_form is None or objects.is_mutable(resolved_form)  \
+			or objects.is_mutable(value):
 		return
+	if tracer.events is not None:
+		tracer.record(tracer.VMAP, len(evaluator.stack), resolved_form, value)
 
 	new = value
 	old = vmap.get(resolved_form)
@@ -1,17 +1,23 @@
 from .evaluator import evaluate
 from .builtin import builtin_symbols
-from jim import reader
+from jim import reader, cache, printer, tracer
 from jim.evaluator.evaluator import init_evaluator
-from jim.evaluator.errors import JimmyError, format_error
+from jim.evaluator.errors import JimmyError, write_error
+import jim.main
 import sys
 
 
 def main(argv):
+	options, argv = jim.main.split_options(argv)
+	if not jim.main.apply_common_options(options):
+		jim.main.print_usage()
+		return
+
 	context = init_evaluator(builtin_symbols)
 
 	match argv:
 		case []:  # interactive mode
-			forms = reader.load_forms(lambda: sys.stdin.read(1))
+			forms = reader.load_forms(sys.stdin.readline)
 			while True:
 				print("<- ", end="", flush=True)
 				try:
@@ -25,26 +31,29 @@ def main(argv):
 				try:
 					result = evaluate(form, context)
 					if result is not None:
-						print("->", repr(result), flush=True)
+						sys.stdout.write("-> ")
+						printer.write_form(result, sys.stdout, repr)
+						print(flush=True)
 				except JimmyError as e:
-					print(format_error(e), file=sys.stderr)
+					write_error(e, sys.stderr)
+					tracer.dump()
 
 		case [filename]:
-			if filename == "-":
-				f = sys.stdin
-			else:
-				f = open(filename)
-			with f:
-				try:
-					for form in reader.load_forms(lambda: f.read(1)):
-						#print("REPROD:", str(form).rstrip())
-						evaluate(form, context)
-				except reader.ParseError as e:
-					sys.exit(e)
-				except JimmyError as e:
-					print(format_error(e), file=sys.stderr)
-					sys.exit(2)
+			try:
+				if filename == "-":
+					forms = reader.load_forms(
+							lambda: sys.stdin.read(reader.CHUNK_SIZE))
+				else:
+					forms = cache.load_forms(filename)
+				for form in forms:
+					#print("REPROD:", str(form).rstrip())
+					evaluate(form, context)
+			except reader.ParseError as e:
+				sys.exit(e)
+			except JimmyError as e:
+				write_error(e, sys.stderr)
+				tracer.dump()
+				sys.exit(2)
 
 		case _:
-			import jim.main
 			jim.main.print_usage()
@@ -1,38 +1,67 @@
-if __debug__:
-	from functools import wraps
-	from sys import stderr
-	def debug(*args, **kws):
+"""
+Debug output, controlled by the JIM_DEBUG environment variable:
+0 or unset is silent, 1 (MESSAGES) prints debug messages,
+and 2 (CALLS) also traces calls to functions marked with trace_entry/exit.
+
+Since building a message is the expensive part,
+callers formatting a message should check level first:
+	if jim.debug.level:
+		debug(f"...")
+
+With python -O, level is always 0.
+"""
+
+from functools import wraps
+from sys import stderr
+import os
+
+MESSAGES = 1
+CALLS = 2
+
+
+def _level_from_env():
+	value = os.environ.get("JIM_DEBUG") or "0"
+	try:
+		return int(value)
+	except ValueError:
+		return MESSAGES
+
+level = _level_from_env() if __debug__ else 0
+
+
+def debug(*args, **kws):
+	if level >= MESSAGES:
 		kws.setdefault("file", stderr)
 		print("[DEBUG]", *args, **kws)
 
-	def _format_item(kv):
-		return f"{kv[0]}={kv[1]}"
-	def _format_call(fn, args, kws):
-		if len(kws) == 0:
-			kws_str = ""
-		else:
-			kws_str = ", " + ", ".join(map(_format_item, kws.items()))
-		return f"{fn.__name__}({', '.join(map(str, args))}{kws_str})"
-
-	def trace_entry(fn):
-		@wraps(fn)
-		def _(*args, **kws):
-			debug(f"CALL: {_format_call(fn, args, kws)}")
-			return fn(*args, **kws)
-		return _
-
-	def trace_exit(fn):
-		@wraps(fn)
-		def _(*args, **kws):
-			result = fn(*args, **kws)
-			debug(f"RETN: {_format_call(fn, args, kws)} -> {result}")
-			return result
-		return _
-
-else:
-	def debug(*args, **kws):
-		pass
-	def trace_entry(fn):
+
+def _format_item(kv):
+	return f"{kv[0]}={kv[1]}"
+def _format_call(fn, args, kws):
+	if len(kws) == 0:
+		kws_str = ""
+	else:
+		kws_str = ", " + ", ".join(map(_format_item, kws.items()))
+	return f"{fn.__name__}({', '.join(map(str, args))}{kws_str})"
+
+# Whether calls are traced is decided when the function is decorated,
+# so that untraced functions are left as they are.
+
+def trace_entry(fn):
+	if level < CALLS:
 		return fn
-	def trace_exit(fn):
+	@wraps(fn)
+	def _(*args, **kws):
+		debug(f"CALL: {_format_call(fn, args, kws)}")
+		return fn(*args, **kws)
+	return _
+
+def trace_exit(fn):
+	if level < CALLS:
 		return fn
+	@wraps(fn)
+	def _(*args, **kws):
+		result = fn(*args, **kws)
+		debug(f"RETN: {_format_call(fn, args, kws)} -> {result}")
+		return result
+	return _
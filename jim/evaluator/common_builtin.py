@@ -1,12 +1,15 @@
+import sys
 from functools import reduce
 import operator as ops
-from itertools import pairwise, filterfalse, starmap
+from itertools import pairwise, filterfalse, starmap, repeat
 
 from jim.objects import *
 import jim.objects as objects  # is_mutable, wrap_bool
+from jim.reader import LazyList
+import jim.printer as printer
 from jim.evaluator.execution import Function, Macro
 import jim.evaluator.errors as errors
-from jim.evaluator.evaluator import push, evaluate
+from jim.evaluator.evaluator import push, evaluate, evaluate_tail
 
 
 builtin_symbols = {
@@ -57,6 +60,18 @@ def _flatten(coll):
 	return reduce(combine, coll, [])
 
 
+class BuiltinFunction(Function):
+	"""
+	A Function implemented as a plain python function
+	which never pushes frames, so it can also be called directly.
+	"""
+	__slots__ = ()
+
+	def evaluate(self, calling_context, **locals):
+		return self.call(**locals)
+		yield
+
+
 def function_execution(*param_spec, conversion=lambda x: x, allow_unknown=False):
 	"""
 	Decorates a function to be an execution.Function class,
@@ -67,12 +82,11 @@ def function_execution(*param_spec, conversion=lambda x: x, allow_unknown=False)
 	def decorator(fn):
 		def __init__(self):
 			Function.__init__(self, param_spec)
-		def evaluate(self, calling_context, **locals):
+		def call(**locals):
 			return conversion(fn(**locals))
-			yield
-		# Creates a class of the same name, with Function as parent.
-		return type(fn.__name__, (Function,),
-				{ '__init__': __init__, 'evaluate': evaluate })
+		# Creates a class of the same name, with BuiltinFunction as parent.
+		return type(fn.__name__, (BuiltinFunction,),
+				{ '__init__': __init__, 'call': staticmethod(call) })
 	return decorator
 
 
@@ -131,24 +145,73 @@ class Let(Execution):
 				raise errors.JimmyError("Definition target is not an identifier.", k)
 			f = push(v, new_context)
 			yield
-			new_context[k.value] = f.result
-
-		f = push(wrap_progn(forms), new_context)
-		yield
-		return f.result
+			new_context.bind(k.value, f.result)
+
+		return (yield from evaluate_tail(wrap_progn(forms), new_context))
+
+
+def _is_unparsed(form):
+	return isinstance(form, LazyList) and not form.is_parsed
+
+def _symbol_names(form):
+	pending = [form]
+	while pending:
+		form = pending.pop()
+		if isinstance(form, Symbol):
+			yield form.value
+		elif isinstance(form, List):
+			pending.extend(form)
+
+def _parsed_symbol_names(form):
+	"""Like _symbol_names, but None if part of the form is not parsed yet."""
+	names = set()
+	pending = [form]
+	while pending:
+		form = pending.pop()
+		if isinstance(form, Symbol):
+			names.add(form.value)
+		elif isinstance(form, List):
+			if _is_unparsed(form):
+				return None
+			pending.extend(form)
+	return names
 
 
 class UserExecution(Execution):
 	class Instance(Execution):
+		__slots__ = ("body", "closure", "_body_names", "_mutable")
+
 		def __init__(self, parameter_spec, body, closure):
 			Execution.__init__(self, parameter_spec)
 			self.body = body
 			self.closure = closure
+			self._body_names = None
+			self._mutable = None
 
 		def evaluate(self, calling_context, **locals):
-			f = push(self.body, self.closure.new_child(locals))
-			yield
-			return f.result
+			return (yield from evaluate_tail(self.body, self.closure.new_child(locals)))
+
+		def captures_mutable(self, checking):
+			# Only the variables the body refers to matter.
+			# A closure referring back to itself (or a cycle of them)
+			# is not followed again while it is being checked.
+			# The closure is fixed once made, so the answer is kept
+			# (see is_mutable for when it can't be).
+			if self._mutable is not None:
+				return self._mutable
+			if self in checking:
+				return False
+			if self._body_names is None:
+				self._body_names = frozenset(_symbol_names(self.body))
+			checking.add(self)
+			try:
+				mutable = any(objects.is_mutable(self.closure[name], checking)
+						for name in self._body_names if name in self.closure)
+			finally:
+				checking.discard(self)
+			if mutable or not checking:
+				self._mutable = mutable
+			return mutable
 
 		def __eq__(self, other):
 			return self is other
@@ -170,7 +233,8 @@ class UserExecution(Execution):
 				case List(elements=[Symbol(value=name), Form() as default]):  # optional
 					default = evaluate(default, context)
 					if objects.is_mutable(default):
-						raise JimmyError("Default argument cannot be or contain a mutable object.")
+						raise errors.JimmyError(
+								"Default argument cannot be or contain a mutable object.", default)
 					else:
 						param_spec.append([name, default])
 				case _:
@@ -178,14 +242,29 @@ class UserExecution(Execution):
 							"The parameter specification is invalid.", p)
 		return param_spec
 
+	@staticmethod
+	def capture(context, param_spec, body):
+		"""
+		Makes the closure of a function: a copy of the variables
+		its body refers to (other than the parameters), not of everything in scope.
+		"""
+		names = _parsed_symbol_names(body)
+		if names is None or "load" in names:
+			# The loaded forms can refer to anything;
+			# and a body left to be parsed when called is not parsed for this.
+			return context.copy()
+		names.difference_update(p if isinstance(p, str) else p[0] for p in param_spec)
+		return context.capture(names)
+
 	def evaluate(self, calling_context, param_spec, body, **extra_kws):
+		param_spec = UserExecution.prepare_param_spec(param_spec, calling_context)
 		# Instance can refer to a different impl from above defined by a sub-class.
 		execution = self.Instance(
-				UserExecution.prepare_param_spec(param_spec, calling_context),
+				param_spec,
 				wrap_progn(body),
-				closure=calling_context.copy(),
+				closure=UserExecution.capture(calling_context, param_spec, body),
 				**extra_kws)
-		execution.closure["*recur*"] = execution
+		execution.closure.bind("*recur*", execution)
 		return execution
 		yield
 
@@ -196,12 +275,12 @@ class Progn(Execution):
 		super().__init__([["forms"]])
 
 	def evaluate(self, context, forms):
-		result = nil
-		for form in forms:
-			f = push(form, context)
+		if len(forms) == 0:
+			return nil
+		for form in forms[:-1]:
+			push(form, context)
 			yield
-			result = f.result
-		return result
+		return (yield from evaluate_tail(forms[-1], context))
 
 
 @builtin_symbol("precond")
@@ -240,8 +319,8 @@ class ParameterizedPostCondition(Execution):
 		result = f.result
 
 		for name in self.variables:
-			start_context[name] = context[name]
-		start_context["*result*"] = result
+			start_context.bind(name, context[name])
+		start_context.bind("*result*", result)
 
 		f = push(condition, start_context)
 		yield
@@ -260,7 +339,7 @@ class PostCondition(ParameterizedPostCondition):
 		f = push(wrap_progn(forms), context)
 		yield
 		result = f.result
-		start_context["*result*"] = result
+		start_context.bind("*result*", result)
 
 		f = push(condition, start_context)
 		yield
@@ -461,7 +540,8 @@ class IfCondition(Macro):
 @builtin_symbol("print")
 @function_execution("msg")
 def Print(msg):
-	print(msg)
+	printer.write_form(msg, sys.stdout)
+	sys.stdout.write("\n")
 	return nil
 
 
@@ -470,21 +550,23 @@ def Print(msg):
 def MakeList(elements):
 	return List(elements)
 
-#@builtin_symbol("mlist")
-#@function_execution(["elements"])
-#def MakeMutableList(elements):
-#	return MutableList(elements)
+@builtin_symbol("mlist")
+@function_execution(["elements"])
+def MakeMutableList(elements):
+	return MutableList(elements)
 
 
 @builtin_symbol("list?")
 @function_execution("val")
 def ListTest(val):
-	return isinstance(form, List)
+	return objects.wrap_bool(isinstance(val, (List, MutableList, IntVector)))
 
 
 @builtin_symbol("get")
 @function_execution("lst", "idx")
 def Get(lst, idx):
+	if isinstance(lst, Map):
+		return lst.get(idx, nil)
 	idx = _unwrap_int(idx)
 	try:
 		return lst[idx % len(lst)]
@@ -495,38 +577,85 @@ def Get(lst, idx):
 @builtin_symbol("rest")
 @function_execution("lst")
 def Rest(lst):
-	return List(lst[1:])
+	# Each kind of list makes its own rest: slicing a mutable list
+	# would give a Python list.
+	if not isinstance(lst, (List, MutableList, IntVector)):
+		raise errors.ValueError(lst, "Value is not a list.")
+	return lst.rest
 
 
 @builtin_symbol("conj")
 @function_execution(["lists"])
 def Conjoin(lists):
-	return List(reduce(ops.add, lists, []))
+	if len(lists) == 0:
+		return List()
+	first = lists[0]
+	if len(lists) == 1:
+		# Never the argument itself, which could be mutable.
+		if isinstance(first, MutableList):
+			return MutableList(first)
+		return first[:] if isinstance(first, (List, IntVector)) else first
+	# Appends to the first list without copying it
+	# (a mutable one makes a new mutable list).
+	return reduce(ops.add, lists[1:], first)
 
 
 @builtin_symbol("assoc")
 @function_execution("lst", "idx", "val")
 def Associate(lst, idx, val):
+	if isinstance(lst, Map):
+		return lst.assoc(idx, val)
+	idx = _unwrap_int(idx)
+	try:
+		return lst.assoc(idx % len(lst), val)
+	except ZeroDivisionError:
+		raise errors.IndexError
+
+
+@builtin_symbol("assoc!")
+@function_execution("lst", "idx", "val")
+def MutatingAssociate(lst, idx, val):
+	if not isinstance(lst, MutableList):
+		raise errors.JimmyError("Provided list is not mutable.")
 	idx = _unwrap_int(idx)
-	copy = list(lst)
 	try:
-		copy[idx % len(lst)] = val
+		lst[idx % len(lst)] = val
 	except ZeroDivisionError:
 		raise errors.IndexError
-	return List(copy)
+	return lst
 
 
-#@builtin_symbol("assoc!")
-#@function_execution("lst", "idx", "val")
-#def MutatingAssociate(lst, idx, val):
-#	if not isinstance(lst, MutableList):
-#		raise errors.JimmyError("Provided list is not mutable.")
-#	idx = _unwrap_int(idx)
-#	try:
-#		lst[idx % len(lst)] = val
-#	except ZeroDivisionError:
-#		raise errors.IndexError
-#	return lst
+@builtin_symbol("hash-map")
+@function_execution(["keys_and_values"])
+def MakeMap(keys_and_values):
+	if len(keys_and_values) % 2 != 0:
+		raise errors.JimmyError("Keys and values do not pair up.")
+	it = iter(keys_and_values)
+	return Map(zip(it, it))
+
+
+@builtin_symbol("map?")
+@function_execution("val")
+def MapTest(val):
+	return objects.wrap_bool(isinstance(val, Map))
+
+
+def _unwrap_map(m):
+	if not isinstance(m, Map):
+		raise errors.ValueError(m, "Value is not a map.")
+	return m
+
+
+@builtin_symbol("dissoc")
+@function_execution("m", "key")
+def Dissociate(m, key):
+	return _unwrap_map(m).dissoc(key)
+
+
+@builtin_symbol("keys")
+@function_execution("m")
+def Keys(m):
+	return List(_unwrap_map(m).keys())
 
 
 @builtin_symbol("len")
@@ -535,6 +664,95 @@ def Length(lst):
 	return Integer(len(lst))
 
 
+# Integer vectors and their elementwise operations.
+# The loops over the elements all run inside map and sum,
+# instead of one stack frame per element.
+
+def _unwrap_vector(v):
+	if not isinstance(v, IntVector):
+		raise errors.ValueError(v, "Value is not an integer vector.")
+	return v.values
+
+
+def _operands(a, b):
+	"""
+	Produces the element values of both operands for an elementwise operation.
+	Either one can be an integer, which is then paired with every element.
+	"""
+	if isinstance(a, Integer):
+		if isinstance(b, Integer):
+			raise errors.ValueError(a, "Neither operand is an integer vector.")
+		b_values = _unwrap_vector(b)
+		return repeat(a.value, len(b_values)), b_values
+	a_values = _unwrap_vector(a)
+	if isinstance(b, Integer):
+		return a_values, repeat(b.value, len(a_values))
+	if len(_unwrap_vector(b)) != len(a_values):
+		raise errors.ValueError(b, "Vector lengths do not match.")
+	return a_values, b.values
+
+
+def _nonzero_divisor(b):
+	if isinstance(b, Integer) and b.value == 0  \
+			or isinstance(b, IntVector) and 0 in b.values:
+		raise errors.DivideByZeroError()
+	return b
+
+
+def _elementwise(name, op, check=lambda b: b, conversion=IntVector):
+	@builtin_symbol(name)
+	@function_execution("a", "b", conversion=conversion)
+	def Elementwise(a, b):
+		return map(op, *_operands(a, check(b)))
+	return Elementwise
+
+VectorAddition = _elementwise("v+", ops.add)
+VectorSubtraction = _elementwise("v-", ops.sub)
+VectorMultiplication = _elementwise("v*", ops.mul)
+VectorDivision = _elementwise("v/", ops.floordiv, _nonzero_divisor)
+VectorModulo = _elementwise("v%", ops.mod, _nonzero_divisor)
+
+# Comparisons give lists of booleans.
+def _bool_list(values):
+	return List(map(objects.wrap_bool, values))
+
+VectorLessThan = _elementwise("v<", ops.lt, conversion=_bool_list)
+VectorGreaterThan = _elementwise("v>", ops.gt, conversion=_bool_list)
+VectorLessEqual = _elementwise("v<=", ops.le, conversion=_bool_list)
+VectorGreaterEqual = _elementwise("v>=", ops.ge, conversion=_bool_list)
+VectorEquality = _elementwise("v=", ops.eq, conversion=_bool_list)
+
+
+@builtin_symbol("ivec")
+@function_execution(["elements"], conversion=IntVector)
+def MakeIntVector(elements):
+	return map(_unwrap_int, elements)
+
+
+@builtin_symbol("range")
+@function_execution("a", ["b", nil], ["step", Integer(1)], conversion=IntVector)
+def Range(a, b, step):
+	start, stop = (Integer(0), a) if b is nil else (a, b)
+	step = _unwrap_int(step)
+	if step == 0:
+		raise errors.ValueError(Integer(step), "Step cannot be zero.")
+	return range(_unwrap_int(start), _unwrap_int(stop), step)
+
+
+@builtin_symbol("sum")
+@function_execution("v", conversion=Integer)
+def VectorSum(v):
+	return sum(_unwrap_vector(v))
+
+
+@builtin_symbol("dot")
+@function_execution("a", "b", conversion=Integer)
+def DotProduct(a, b):
+	if len(_unwrap_vector(a)) != len(_unwrap_vector(b)):
+		raise errors.ValueError(b, "Vector lengths do not match.")
+	return sum(map(ops.mul, a.values, b.values))
+
+
 @builtin_symbol("load")
 class Load(Function):
 	def __init__(self):
@@ -543,12 +761,10 @@ class Load(Function):
 	def evaluate(self, context, path):
 		if not isinstance(path, String):
 			raise errors.JimmyError("File path is not a string.")
-		import jim.reader
+		import jim.cache
 
 		try:
-			with open(path.value) as f:
-				with jim.reader.fresh_reader_state():
-					forms = list(jim.reader.load_forms(lambda: f.read(1)))
+			forms = list(jim.cache.load_forms(path.value))
 		except OSError as e:
 			raise errors.LoadError(e)
 
@@ -1,4 +1,6 @@
+import io
 import jim.evaluator.evaluator as evaluator
+import jim.printer as printer
 
 
 class JimmyError(Exception):
@@ -43,16 +45,30 @@ class LoadError(JimmyError):
 		super().__init__(msg + " " + str(cause))
 
 
-def format_error(e):
+# Forms in tracebacks are cut down to this size.
+TRACEBACK_MAX_DEPTH = 8
+TRACEBACK_MAX_LENGTH = 32
+
+def write_error(e, file):
+	def write_form(form):
+		printer.write_form(form, file, repr,
+				TRACEBACK_MAX_DEPTH, TRACEBACK_MAX_LENGTH)
+
 	frames = enumerate(e.stackframes)
 	next(frames)  # Skips the BaseFrame.
 
-	result = "Traceback:\n"
+	file.write("Traceback:\n")
 	for i, f in frames:
-		result += f"  {i}: {f.form!r}\n"
+		file.write(f"  {i}: ")
+		write_form(f.form)
+		file.write("\n")
 
-	result += (
-			f"Offending form: {e.offending_form!r}\n"
-			f"Cause: {e.msg}")
+	file.write("Offending form: ")
+	write_form(e.offending_form)
+	file.write(f"\nCause: {e.msg}\n")
 
-	return result
+
+def format_error(e):
+	out = io.StringIO()
+	write_error(e, out)
+	return out.getvalue().removesuffix("\n")
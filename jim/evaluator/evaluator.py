@@ -1,4 +1,6 @@
 from collections import ChainMap
+import jim.debug
+import jim.tracer as tracer
 from jim.debug import debug, trace_entry, trace_exit
 
 import jim.evaluator.errors as errors
@@ -6,14 +8,79 @@ import jim.evaluator.execution as jexec
 from jim.objects import *
 
 
+# Names that a def has added to an inner scope, which can shadow an outer name
+# in one call but not in the next: the bytecode engine never caches their lookups.
+shadowed = set()
+# Bumped when a name is removed or first added to shadowed,
+# invalidating where the bytecode engine has cached finding names.
+version = 0
+
 class DeepCopyChainMap(ChainMap):
 	# This exists so that closures are copied correctly.
 	def __init__(self, *maps):
 		super().__init__(*maps)
 	# Don't actually need to override new_child and parents;
 	# ChainMap constructs the subclass correctly.
+
 	def copy(self):
-		return DeepCopyChainMap(*(m.copy() for m in self.maps))
+		# The copy is flattened into one map (in front of the last, NilContext),
+		# so that names in a closure are found in at most one step
+		# no matter how many scopes it was created in.
+		*maps, last = self.maps
+		flat = {}
+		for m in reversed(maps):
+			flat.update(m)
+		return DeepCopyChainMap(flat, last.copy())
+
+	def capture(self, names):
+		"""Like copy, but only keeps the given names (those defined)."""
+		captured = {}
+		for name in names:
+			for m in self.maps:
+				if name in m:
+					captured[name] = m[name]
+					break
+		return DeepCopyChainMap(captured, self.maps[-1].copy())
+
+	def __getitem__(self, key):
+		# Unlike ChainMap, doesn't raise and catch a KeyError for every map
+		# not having the name, which made looking up builtins slow.
+		# The bytecode engine skips this walk by remembering, per site,
+		# at which map a name was found (see vm._lookup).
+		# TODO Lexical addressing: resolve each reference in a fn body
+		# to a (depth, slot) when the fn is made, with scopes as flat arrays
+		# and a fallback for a def into an enclosing scope.
+		# Which arguments of a form are evaluated is only known at run time
+		# (if, let and the like can be redefined, macros get the raw forms),
+		# and def, the loop copy-back and the checker use contexts by name.
+		for m in self.maps:
+			if key in m:
+				return m[key]
+		# Raises the error from NilContext.
+		return self.maps[-1][key]
+
+	def __setitem__(self, key, value):
+		global version
+		m = self.maps[0]
+		# Only a def into an inner scope invalidates:
+		# names added to the outermost one can't be cached as found further out.
+		if key not in m and len(self.maps) > 2 and key not in shadowed:
+			shadowed.add(key)
+			version += 1
+		m[key] = value
+
+	def __delitem__(self, key):
+		global version
+		version += 1
+		del self.maps[0][key]
+
+	def bind(self, key, value):
+		"""
+		Assigns in a scope made afresh (as by let or a new closure),
+		which has the same names every time it is made.
+		No lookup can be cached on it yet, so none is invalidated.
+		"""
+		self.maps[0][key] = value
 
 class NilContext:
 	"""
@@ -24,6 +91,8 @@ class NilContext:
 		pass
 	def __getitem__(self, name):
 		raise errors.UndefinedVariableError(name)
+	def __contains__(self, name):
+		return False
 	def __setitem__(self, key, val):
 		# Should never happen.
 		assert False
@@ -34,7 +103,48 @@ class NilContext:
 
 stack = []
 
+class TailCall:
+	"""
+	Returned by an execution to have its result be the evaluation of form
+	in context, which the calling frame then does in place of the call.
+	The optional after is run once that evaluation is done.
+	It has a run() method, and absorb(other) to merge in the after of
+	a following tail call if it can, returning whether it did.
+	"""
+	__slots__ = ("form", "context", "after")
+
+	def __init__(self, form, context, after=None):
+		self.form = form
+		self.context = context
+		self.after = after
+
+
+def evaluate_tail(form, context, after=None):
+	"""
+	Evaluates form as the result of the execution calling this,
+	reusing the calling frame if it does tail calls. Use as
+		return (yield from evaluate_tail(form, context))
+	"""
+	if stack[-1].tail_calls:
+		return TailCall(form, context, after)
+	f = push(form, context)
+	yield
+	if after is not None:
+		after.run()
+	return f.result
+
+
 class Stackframe:
+	__slots__ = ("form", "immediate_form", "context", "result", "invocation")
+
+	# Whether the frame evaluates a TailCall in place.
+	tail_calls = True
+	# Whether atoms and symbols in a call form are evaluated in place
+	# rather than each on a frame of its own.
+	inline_leaves = True
+	# Whether a call sets immediate_form to the call with its arguments evaluated.
+	keeps_immediate_form = False
+
 	def __init__(self, form, context):
 		self.form = form
 		# We intentionally leave this undefined until when the value is available
@@ -53,26 +163,44 @@ class Stackframe:
 		yielding whenever another stackframe is pushed on top.
 		The result of the call is stored in the result field of the given frame.
 		"""
-		if isinstance(self.form, Symbol):
-			self.result = self.immediate_form = self.context[self.form.value]
-		elif (result := evaluate_simple_form(self.form, self.context)) is not push:
-			self.result = self.immediate_form = result
-		else:
-			yield from self.evaluate_call_form()
+		afters = []
+		while True:
+			if isinstance(self.form, Symbol):
+				self.result = self.immediate_form = self.context[self.form.value]
+			elif (result := evaluate_simple_form(self.form, self.context)) is not push:
+				self.result = self.immediate_form = result
+			elif (tail := (yield from self.evaluate_call_form())) is not None:
+				# The call is replaced by the form it evaluates to,
+				# so no frame is pushed for that form.
+				self.form = tail.form
+				self.context = tail.context
+				if tail.after is not None  \
+						and not (afters and afters[-1].absorb(tail.after)):
+					afters.append(tail.after)
+				continue
+			break
+		for after in reversed(afters):
+			after.run()
 
 	def evaluate_call_form(self):
 		target, *args = self.form
 
-		# Poor man's Future with generators.
-		f = push(target, self.context)
-		yield
-		target = f.result
+		inline = self.inline_leaves
+		if not inline or (value := evaluate_leaf(target, self.context)) is push:
+			# Poor man's Future with generators.
+			f = push(target, self.context)
+			yield
+			value = f.result
+		target = value
 
 		if not isinstance(target, Execution):
 			raise errors.JimmyError("Invocation target is invalid.", self.form)
 
 		if isinstance(target, jexec.EvaluateIn):
 			for i, arg in enumerate(args):
+				if inline and (value := evaluate_leaf(arg, self.context)) is not push:
+					args[i] = value
+					continue
 				f = push(arg, self.context)
 				yield
 				args[i] = f.result
@@ -82,11 +210,12 @@ class Stackframe:
 		except jexec.ArgumentMismatchError:
 			raise errors.ArgumentMismatchError(self.form) from None
 
-		# We need this so that the same calls expressed as different forms
-		# for arguments can be identified to be the same in the v-map.
-		# But this can not be the only mechanism,
-		# as it only functions when we don't have a contradiction.
-		self.immediate_form = List([target, *args])
+		if self.keeps_immediate_form:
+			# We need this so that the same calls expressed as different forms
+			# for arguments can be identified to be the same in the v-map.
+			# But this can not be the only mechanism,
+			# as it only functions when we don't have a contradiction.
+			self.immediate_form = List([target, *args])
 
 		target_eval = target.evaluate(self.context, **matched_args)
 		while True:
@@ -111,7 +240,11 @@ class Stackframe:
 					# before the next next() call.
 					break
 
+		if isinstance(self.result, TailCall):
+			return self.result
 		if isinstance(target, jexec.EvaluateOut):
+			if self.tail_calls:
+				return TailCall(self.result, self.context)
 			f = push(self.result, self.context)
 			yield
 			self.result = f.result
@@ -141,11 +274,16 @@ def push(form, context):
 #	debug(f"CALL: push({form})")
 	frame = Stackframe(form, context)
 	stack.append(frame)
+	if tracer.events is not None:
+		tracer.record(tracer.PUSH, len(stack), form)
 	return frame
 
 def pop():
 	frame = stack.pop()
-	debug(f" POP: {frame}")
+	if tracer.events is not None:
+		tracer.record(tracer.POP, len(stack) + 1, frame.form, frame.result)
+	if jim.debug.level:
+		debug(f" POP: {frame}")
 	return frame.result
 
 
@@ -176,6 +314,8 @@ def evaluate(obj, context=None):
 			# An error happened and the last frame did not handle.
 			# Try to let the previous generators handle the exception.
 			error = e
+			if tracer.events is not None:
+				tracer.record(tracer.THROW, len(stack), stack[-1].form, e)
 			if len(stack) > zero:
 				pop()
 			else:
@@ -183,9 +323,23 @@ def evaluate(obj, context=None):
 				raise e
 
 
+def evaluate_leaf(obj, context):
+	"""
+	Like evaluate_simple_form, but also looks up symbols.
+	Returns push for a name that is not defined as well,
+	to raise the error from the frame it is expected on.
+	"""
+	if isinstance(obj, Symbol):
+		try:
+			return context[obj.value]
+		except errors.UndefinedVariableError:
+			return push
+	return evaluate_simple_form(obj, context)
+
+
 def evaluate_simple_form(obj, context):
 	match obj:
-		case Atom():
+		case Atom() | MutableList() | IntVector() | Map():
 			return obj
 
 		case List():
@@ -3,19 +3,27 @@ import jim.evaluator.errors as errors
 
 
 class EvaluateIn:
+	__slots__ = ()
+
 	def __init__(self, *args, **kws):
 		super().__init__(*args, **kws)
 
 class EvaluateOut:
+	__slots__ = ()
+
 	def __init__(self, *args, **kws):
 		super().__init__(*args, **kws)
 
 
 class Function(EvaluateIn, objects.Execution):
+	__slots__ = ()
+
 	def __init__(self, parameter_spec):
 		super().__init__(parameter_spec)
 
 class Macro(EvaluateOut, objects.Execution):
+	__slots__ = ()
+
 	def __init__(self, parameter_spec):
 		super().__init__(parameter_spec)
 
@@ -31,11 +39,6 @@ def fill_parameters(parameter_spec, arguments) -> dict[str, objects.Form]:
 	params = dict()  # collects arguments to match up with parameters
 	arg_idx = 0
 
-	def fill_one_param(param, arg=None):
-		nonlocal params, arg_idx
-		params[param] = arguments[arg_idx] if arg is None else arg
-		arg_idx += 1
-
 	for p in parameter_spec:
 		if isinstance(p, str):  # positional
 			if arg_idx < len(arguments):
@@ -1,6 +1,7 @@
 from abc import ABC, abstractmethod
 from jim.objects import *
 from jim.objects import filter_tree
+import jim.debug
 from jim.debug import debug
 
 
@@ -83,7 +84,8 @@ def compound(ast):
 def compound(ast, *children):
 	idx = 0
 	for s in children:
-		debug(f"GRAMMAR: {s!r} == {ast[idx] if idx < len(ast) else None!r}")
+		if jim.debug.level:
+			debug(f"GRAMMAR: {s!r} == {ast[idx] if idx < len(ast) else None!r}")
 		if isinstance(s, repeat):
 			while idx < len(ast) and s.component.check(ast[idx]):
 				idx += 1
@@ -1,15 +1,30 @@
+import operator
 import jim.evaluator.common_builtin as common
 import jim.evaluator.evaluator as evaluator
 from jim.evaluator.execution import EvaluateIn, Macro
 import jim.evaluator.errors as errors
+import jim.interpreter.jit as jit
 from jim.objects import *
 
 
 @common.builtin_symbol("fn")
 class UserFunction(common.UserExecution):
 	class Instance(EvaluateIn, common.UserExecution.Instance):
+		# For the jit: the number of calls, then the compiled function,
+		# or False if it is not to be compiled.
+		__slots__ = ("calls", "compiled")
+
 		def __init__(self, parameter_spec, code, closure):
 			super().__init__(parameter_spec, code, closure)
+			self.calls = 0
+			self.compiled = None
+
+		def evaluate(self, calling_context, **locals):
+			if jit.enabled:
+				result = jit.call(self, locals)
+				if result is not None:
+					return result
+			return (yield from super().evaluate(calling_context, **locals))
 	def evaluate(self, calling_context, param_spec, body):
 		# fn uses simple postcond.
 		return super().evaluate(
@@ -18,9 +33,49 @@ class UserFunction(common.UserExecution):
 			param_spec, body)
 
 
+class _CopyBack:
+	"""
+	Sends the loop variables in source back to the calling context (target)
+	once an iteration and all it tail-called are done.
+	"""
+	__slots__ = ("names", "source", "target", "last")
+
+	def __init__(self, names, source, target):
+		self.names = names
+		self.source = source
+		self.target = target
+		# The context of the latest iteration tail-called.
+		self.last = source
+
+	def run(self):
+		for name in self.names:
+			self.target[name] = self.source[name]
+
+	def absorb(self, other):
+		if other.names is not self.names:
+			return False
+		if other.target is self.last:
+			# Called from the body of the latest iteration:
+			# its variables pass through that one's on to ours.
+			if self.source is self.last:
+				self.source = other.source
+		elif not _is_child(other.target, self.last):
+			return False
+		# Otherwise called inside a let in that body,
+		# so the variables it sends back are dropped along with the let.
+		self.last = other.source
+		return True
+
+def _is_child(context, parent):
+	return len(context.maps) == len(parent.maps) + 1  \
+			and all(map(operator.is_, context.maps[1:], parent.maps))
+
+
 @common.builtin_symbol("loop")
 class Loop(common.UserExecution):
 	class Instance(UserFunction.Instance):
+		__slots__ = ("alive",)
+
 		def __init__(self, names, body, closure):
 			# loop needs parameterized postcond.
 			closure = closure.new_child(
@@ -32,13 +87,12 @@ class Loop(common.UserExecution):
 			if not self.alive:
 				raise errors.JimmyError("Cannot invoke loop iteration outside of loop.")
 
+			# Bound with the variables rather than assigned after,
+			# which would invalidate every cached lookup on each iteration.
+			locals["*recur*"] = self
 			body_context = self.closure.new_child(locals)
-			body_context["*recur*"] = self
-			f = evaluator.push(self.body, body_context)
-			yield
-			for name in self.parameter_spec:
-				calling_context[name] = body_context[name]
-			return f.result
+			return (yield from evaluator.evaluate_tail(self.body, body_context,
+					_CopyBack(self.parameter_spec, body_context, calling_context)))
 
 	def evaluate(self, context, param_spec, body):
 		# Loop instance only accepts positional params corresponding to variables
@@ -1,5 +1,11 @@
 import jim.evaluator.evaluator as evaluator
 import jim.interpreter.builtin
+import jim.interpreter.vm as vm
+
+# Set by the --engine option of jim run.
+engine = "tree"
 
 def evaluate(obj, context=None):
+	if engine == "vm":
+		return vm.execute(obj, context)
 	return evaluator.evaluate(obj, context)
@@ -0,0 +1,430 @@
+"""
+Compiles hot user functions to python, for the interpreter.
+
+Each fn instance counts its calls; past THRESHOLD, its body is translated
+into the source of a python function and compiled with exec.
+Only pure functions are compiled: the body may use if, let, progn,
+precond and postcond, call *recur*, builtin functions without side effects,
+and other functions which can themselves be compiled.
+Anything else (def, loop, fn, print, ...) leaves the function interpreted.
+Calls of *recur* in tail position become a loop.
+
+The compiled function does not push frames or check anything
+beyond what it needs to get the same result as the evaluator.
+On anything out of the ordinary, be it an error, an unknown value
+or simply a case not handled, it raises and the call is evaluated again
+by the interpreter from the start, which, as nothing was changed,
+gives exactly the result or error it would have had.
+A function for which that happened is interpreted from then on.
+"""
+
+import operator as ops
+
+import jim.debug
+from jim.debug import debug
+from jim.objects import *
+import jim.objects as objects
+import jim.evaluator.execution as jexec
+import jim.evaluator.errors as errors
+import jim.evaluator.common_builtin as common
+import jim.interpreter.builtin as builtin
+
+
+# Set to False by the --no-jit option of jim run.
+enabled = True
+
+# Calls of a function before it is compiled.
+THRESHOLD = 100
+
+# Compiled factories by source, shared by instances of the same fn form.
+_factories = {}
+CACHE_SIZE = 1024
+
+
+class _Fallback(Exception):
+	"""Raised by compiled code to have the call evaluated by the interpreter."""
+	pass
+
+class _Unsupported(Exception):
+	"""The function cannot be compiled."""
+	pass
+
+
+def call(function, locals):
+	"""
+	Runs a call of an interpreter fn instance compiled,
+	returning None if it has to be left to the interpreter.
+	"""
+	compiled = function.compiled
+	if compiled is None:
+		function.calls += 1
+		if function.calls < THRESHOLD:
+			return None
+		compiled = compile_function(function)
+	if compiled is False:
+		return None
+	try:
+		return compiled(*locals.values())
+	except Exception:
+		function.compiled = False
+		return None
+
+
+_compiling = set()
+
+def compile_function(function):
+	"""
+	Compiles the fn instance, storing the python function in its compiled slot.
+	Returns it, or False if the instance cannot be compiled.
+	"""
+	if function.compiled is not None:
+		return function.compiled
+	if function in _compiling:
+		raise _Unsupported
+	_compiling.add(function)
+	try:
+		try:
+			source, values = _FunctionCompiler(function).compile()
+		except (_Unsupported, RecursionError):
+			function.compiled = False
+			return False
+		factory = _factories.get(source)
+		if factory is None:
+			if jim.debug.level:
+				debug(f"JIT: {function.body}\n{source}")
+			if len(_factories) >= CACHE_SIZE:
+				_factories.clear()
+			namespace = dict(_runtime)
+			exec(source, namespace)
+			factory = _factories[source] = namespace["_factory"]
+		function.compiled = factory(*values)
+		return function.compiled
+	finally:
+		_compiling.discard(function)
+
+
+# Builtin functions which compiled code may call.
+# The rest have side effects, or are not functions.
+_IMPURE = {"print", "assoc!", "__debug__"}
+
+def _pure_builtins():
+	return {id(execution): execution
+			for name, execution in common.builtin_symbols.items()
+			if isinstance(execution, common.BuiltinFunction) and name not in _IMPURE}
+
+
+def _binary(name, op, conversion):
+	"""
+	A version of the builtin for two arguments,
+	computing directly when both are integers.
+	"""
+	execution = common.builtin_symbols[name]
+	def fast(a, b):
+		if type(a) is Integer and type(b) is Integer:
+			return conversion(op(a.value, b.value))
+		return execution.call(**jexec.fill_parameters(execution.parameter_spec, [a, b]))
+	return fast
+
+_fast_binary = {id(common.builtin_symbols[name]): _binary(name, op, conversion)
+	for name, op, conversion in [
+		("+", ops.add, Integer),
+		("-", ops.sub, Integer),
+		("*", ops.mul, Integer),
+		("=", ops.eq, objects.wrap_bool),
+		("<", ops.lt, objects.wrap_bool),
+		(">", ops.gt, objects.wrap_bool),
+		("<=", ops.le, objects.wrap_bool),
+		(">=", ops.ge, objects.wrap_bool)]}
+
+
+def _fail():
+	raise _Fallback
+
+def _invoke(target, args):
+	"""Calls a target only known at run time."""
+	if id(target) in _pure and _pure[id(target)] is target:
+		return target.call(**jexec.fill_parameters(target.parameter_spec, args))
+	if type(target) is builtin.UserFunction.Instance:
+		compiled = compile_function(target)
+		if compiled is not False:
+			return compiled(*jexec.fill_parameters(target.parameter_spec, args).values())
+	raise _Fallback
+
+_pure = _pure_builtins()
+
+# Globals of the compiled code.
+_runtime = {
+	"_true": true,
+	"_false": false,
+	"_List": List,
+	"_Fallback": _Fallback,
+	"_fail": _fail,
+	"_invoke": _invoke,
+}
+
+
+class _FunctionCompiler:
+	def __init__(self, function):
+		self.function = function
+		self.lines = []
+		self.indent = 3
+		# Objects the code refers to, passed to the factory.
+		self.values = []
+		self.value_names = {}
+		self.temps = 0
+
+	def compile(self):
+		spec = self.function.parameter_spec
+		self.params = [f"_a{i}" for i in range(len(spec))]
+		scope = {p if isinstance(p, str) else p[0]: name
+				for p, name in zip(spec, self.params)}
+		self.tail(self.function.body, scope)
+		source = "\n".join([
+			f"def _factory({', '.join(self.value_names.values())}):",
+			f"\tdef _function({', '.join(self.params)}):",
+			"\t\twhile True:",
+			*self.lines,
+			"\treturn _function",
+			""])
+		return source, self.values
+
+	def emit(self, line):
+		self.lines.append("\t" * self.indent + line)
+
+	def bind(self, value):
+		"""The name of a value given to the factory."""
+		name = self.value_names.get(id(value))
+		if name is None:
+			name = self.value_names[id(value)] = f"_v{len(self.values)}"
+			self.values.append(value)
+		return name
+
+	def temp(self):
+		self.temps += 1
+		return f"_t{self.temps}"
+
+	def lookup(self, name):
+		"""
+		The value of a variable which is not local,
+		fixed when the fn was created as the closure is a copy.
+		"""
+		try:
+			return self.function.closure[name]
+		except errors.UndefinedVariableError:
+			return None
+
+	def tail(self, form, scope):
+		"""Emits code returning the value of form."""
+		if isinstance(form, List) and len(form) > 0:
+			self.call(form, scope, tail=True)
+		else:
+			self.emit(f"return {self.expr(form, scope)}")
+
+	def expr(self, form, scope):
+		"""Emits code computing the value of form, returning an expression for it."""
+		match form:
+			case Symbol(value=name):
+				if name in scope:
+					return scope[name]
+				value = self.lookup(name)
+				return "_fail()" if value is None else self.bind(value)
+			case List() if len(form) > 0:
+				result = self.temp()
+				self.call(form, scope, tail=False, result=result)
+				return result
+			case Atom() | MutableList() | IntVector() | Map() | List():
+				return self.bind(_constant(form))
+			case _:
+				raise _Unsupported
+
+	def value(self, result, expression, tail):
+		if tail:
+			self.emit(f"return {expression}")
+		else:
+			self.emit(f"{result} = {expression}")
+
+	def call(self, form, scope, tail, result=None):
+		head, *args = form
+		match head:
+			case Symbol(value=name) if name in scope:
+				target = None
+			case Symbol(value=name):
+				target = self.lookup(name)
+				if target is None:
+					return self.value(result, "_fail()", tail)
+			case Execution():
+				target = head
+			case List():
+				target = None
+			case _:
+				# Not a valid invocation target.
+				return self.value(result, "_fail()", tail)
+
+		if target is None:
+			target = self.expr(head, scope)
+			arguments = [self.expr(arg, scope) for arg in args]
+			return self.value(result, f"_invoke({target}, [{', '.join(arguments)}])", tail)
+
+		special = _special.get(id(target))
+		if special is not None and special[0] is target:
+			return special[1](self, args, scope, tail, result)
+
+		if target is self.function:
+			arguments = self.arguments(target, args, scope)
+			if arguments is None:
+				return self.value(result, "_fail()", tail)
+			if tail:
+				# Calls itself as the last thing: start over.
+				if arguments:
+					self.emit(f"{', '.join(self.params)} = {', '.join(arguments)}")
+				self.emit("continue")
+				return
+			return self.value(result, f"_function({', '.join(arguments)})", tail)
+
+		if id(target) in _pure and _pure[id(target)] is target:
+			if len(args) == 2 and id(target) in _fast_binary:
+				fast = self.bind(_fast_binary[id(target)])
+				a, b = (self.expr(arg, scope) for arg in args)
+				return self.value(result, f"{fast}({a}, {b})", tail)
+			arguments = self.arguments(target, args, scope)
+			if arguments is None:
+				return self.value(result, "_fail()", tail)
+			keywords = (f"{p if isinstance(p, str) else p[0]}={a}"
+					for p, a in zip(target.parameter_spec, arguments))
+			return self.value(result, f"{self.bind(target.call)}({', '.join(keywords)})", tail)
+
+		if type(target) is builtin.UserFunction.Instance:
+			compiled = compile_function(target)
+			if compiled is False:
+				raise _Unsupported
+			arguments = self.arguments(target, args, scope)
+			if arguments is None:
+				return self.value(result, "_fail()", tail)
+			return self.value(result, f"{self.bind(compiled)}({', '.join(arguments)})", tail)
+
+		if isinstance(target, Execution):
+			raise _Unsupported
+		return self.value(result, "_fail()", tail)
+
+	def arguments(self, target, args, scope):
+		"""
+		Expressions for the parameters of target in order,
+		or None if the arguments do not match, as in fill_parameters.
+		"""
+		matched = []
+		i = 0
+		for p in target.parameter_spec:
+			if isinstance(p, str):
+				if i == len(args):
+					return None
+				matched.append(args[i])
+				i += 1
+			elif len(p) == 1:
+				matched.append(args[i:])
+				i = len(args)
+			elif len(p) == 2:
+				matched.append(args[i] if i < len(args) else None)
+				i = min(i + 1, len(args))
+			else:
+				raise _Unsupported
+		if i != len(args):
+			return None
+
+		arguments = []
+		for p, arg in zip(target.parameter_spec, matched):
+			if isinstance(arg, list):
+				rest = [self.expr(form, scope) for form in arg]
+				arguments.append(f"_List([{', '.join(rest)}])")
+			elif arg is None:
+				arguments.append(self.bind(p[1]))
+			else:
+				arguments.append(self.expr(arg, scope))
+		return arguments
+
+	def block(self, form, scope, tail, result):
+		self.indent += 1
+		if tail:
+			self.tail(form, scope)
+		else:
+			self.emit(f"{result} = {self.expr(form, scope)}")
+		self.indent -= 1
+
+	def condition(self, form, scope):
+		"""Emits code failing unless form is true."""
+		self.emit(f"if {self.expr(form, scope)} is not _true:")
+		self.emit("\traise _Fallback")
+
+
+def _constant(form):
+	if isinstance(form, List):
+		return nil  # Only the empty list gets here.
+	return form
+
+
+# Builtins compiled into the code instead of being called.
+_special = {}
+
+def _compiles(name):
+	def register(fn):
+		execution = common.builtin_symbols[name]
+		_special[id(execution)] = (execution, fn)
+		return fn
+	return register
+
+@_compiles("if")
+def _compile_if(c, args, scope, tail, result):
+	if not 2 <= len(args) <= 3:
+		return c.value(result, "_fail()", tail)
+	condition, success, *fail = args
+	test = c.expr(condition, scope)
+	c.emit(f"if {test} is _true:")
+	c.block(success, scope, tail, result)
+	c.emit(f"elif {test} is _false:")
+	c.block(fail[0] if fail else true, scope, tail, result)
+	c.emit("else:")
+	c.emit("\traise _Fallback")
+
+@_compiles("progn")
+def _compile_progn(c, args, scope, tail, result):
+	if len(args) == 0:
+		return c.value(result, c.bind(nil), tail)
+	for form in args[:-1]:
+		c.emit(c.expr(form, scope))
+	if tail:
+		c.tail(args[-1], scope)
+	else:
+		c.emit(f"{result} = {c.expr(args[-1], scope)}")
+
+@_compiles("let")
+def _compile_let(c, args, scope, tail, result):
+	if len(args) == 0:
+		return c.value(result, "_fail()", tail)
+	bindings, *forms = args
+	if not isinstance(bindings, List) or len(bindings) % 2 != 0  \
+			or not all(isinstance(k, Symbol) for k in bindings[::2]):
+		return c.value(result, "_fail()", tail)
+	scope = dict(scope)
+	for i in range(0, len(bindings), 2):
+		value = c.expr(bindings[i+1], scope)
+		name = c.temp()
+		c.emit(f"{name} = {value}")
+		scope[bindings[i].value] = name
+	_compile_progn(c, forms, scope, tail, result)
+
+@_compiles("precond")
+def _compile_precond(c, args, scope, tail, result):
+	if len(args) == 0:
+		return c.value(result, "_fail()", tail)
+	condition, *forms = args
+	c.condition(condition, scope)
+	_compile_progn(c, forms, scope, tail, result)
+
+@_compiles("postcond")
+def _compile_postcond(c, args, scope, tail, result):
+	if len(args) == 0:
+		return c.value(result, "_fail()", tail)
+	condition, *forms = args
+	value = c.temp()
+	_compile_progn(c, forms, scope, False, value)
+	c.condition(condition, scope | {"*result*": value})
+	c.value(result, value, tail)
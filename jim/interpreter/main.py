@@ -1,16 +1,35 @@
 from .evaluator import evaluate
-from jim import reader
+import jim.interpreter.evaluator
+from jim import reader, cache, printer, tracer
 from jim.evaluator.evaluator import init_evaluator
-from jim.evaluator.errors import JimmyError, format_error
+from jim.evaluator.errors import JimmyError, write_error
+import jim.main
 import sys
 
 
 def main(argv):
+	options, argv = jim.main.split_options(argv)
+	match options.pop("engine", "tree"):
+		case "tree" | "vm" as engine:
+			jim.interpreter.evaluator.engine = engine
+		case _:
+			jim.main.print_usage()
+			return
+	match options.pop("no-jit", False):
+		case True:
+			jim.interpreter.jit.enabled = False
+		case str():
+			jim.main.print_usage()
+			return
+	if not jim.main.apply_common_options(options):
+		jim.main.print_usage()
+		return
+
 	init_evaluator()
 
 	match argv:
 		case []:  # interactive mode
-			forms = reader.load_forms(lambda: sys.stdin.read(1))
+			forms = reader.load_forms(sys.stdin.readline)
 			while True:
 				print("<- ", end="", flush=True)
 				try:
@@ -24,26 +43,29 @@ def main(argv):
 				try:
 					result = evaluate(form)
 					if result is not None:
-						print("->", repr(result), flush=True)
+						sys.stdout.write("-> ")
+						printer.write_form(result, sys.stdout, repr)
+						print(flush=True)
 				except JimmyError as e:
-					print(format_error(e), file=sys.stderr)
+					write_error(e, sys.stderr)
+					tracer.dump()
 
 		case [filename]:
-			if filename == "-":
-				f = sys.stdin
-			else:
-				f = open(filename)
-			with f:
-				try:
-					for form in reader.load_forms(lambda: f.read(1)):
-						#print("REPROD:", str(form).rstrip())
-						evaluate(form)
-				except reader.ParseError as e:
-					sys.exit(e)
-				except JimmyError as e:
-					print(format_error(e), file=sys.stderr)
-					sys.exit(2)
+			try:
+				if filename == "-":
+					forms = reader.load_forms(
+							lambda: sys.stdin.read(reader.CHUNK_SIZE))
+				else:
+					forms = cache.load_forms(filename)
+				for form in forms:
+					#print("REPROD:", str(form).rstrip())
+					evaluate(form)
+			except reader.ParseError as e:
+				sys.exit(e)
+			except JimmyError as e:
+				write_error(e, sys.stderr)
+				tracer.dump()
+				sys.exit(2)
 
 		case _:
-			import jim.main
 			jim.main.print_usage()
@@ -0,0 +1,518 @@
+"""
+An alternative engine for the interpreter,
+compiling forms to bytecode and running them in a single dispatch loop.
+
+The tree-walking evaluator creates a stackframe and a generator
+for every form evaluated, including symbols and constants.
+Here, a form is compiled once into a flat list of instructions,
+and only call forms leave a (lightweight) frame on evaluator.stack.
+Those frames are exactly the ones the evaluator would have,
+so errors produce the same tracebacks.
+Symbols only get a frame when their lookup fails.
+
+Builtins are the same executions the evaluator uses.
+Those which push frames to evaluate (the generator protocol)
+are driven by the loop in place of the evaluator.
+if, progn and def are compiled inline,
+guarded by a check that the name still refers to the builtin.
+
+Tail calls reuse the frame of the call, as in the evaluator:
+a form in tail position retargets the frame on top of the stack
+instead of pushing its own, and a call just before a RETURN
+replaces the running activation.
+"""
+
+from jim.objects import *
+import jim.objects as objects
+import jim.evaluator.evaluator as evaluator
+import jim.evaluator.execution as jexec
+import jim.evaluator.errors as errors
+import jim.tracer as tracer
+import jim.evaluator.common_builtin as common
+import jim.interpreter.builtin as builtin
+import jim.interpreter.jit as jit
+from jim.reader import LazyList
+
+
+class Frame:
+	"""Stands in for a Stackframe on evaluator.stack."""
+	__slots__ = ("form", "context", "result")
+
+	tail_calls = True
+
+	def __init__(self, form, context):
+		self.form = form
+		self.context = context
+		self.result = None
+
+	def __repr__(self):
+		return f"<{self.form}, {self.result}>"
+
+
+# Opcodes, in order of frequency.
+LOAD = 0      # name, symbol, tail, cache: push the value of a variable
+CONST = 1     # value: push a constant
+ENTER = 2     # form: push a frame for a call form
+LEAVE = 3     # pop the frame of a call form
+TARGET = 4    # form, raw arguments, address: check the invocation target
+INVOKE = 5    # form, number of arguments: call the target
+GUARD = 6     # name, symbol, builtin, address, cache: jump to address unless name is builtin
+BRANCH = 7    # else address, end address: the test of an if
+JUMP = 8      # address
+DISCARD = 9   # drop the top value
+DEFINE = 10   # name: assign the top value in the context
+RETURN = 11   # finish evaluating the form of the frame on top of evaluator.stack
+LOOKUP = 12   # name: variable lookup for a frame which is itself a symbol
+GENERIC = 13  # form: hand the form over to the evaluator
+RETARGET = 14 # form: reuse the frame on top for a form in tail position
+EVALUATE = 15 # form: push a frame for a form compiled only when reached
+
+# Tail positions: in that of the frame on top of the stack,
+# or also in that of the whole activation.
+RECORD = 1
+ACTIVATION = 2
+
+
+class Code:
+	__slots__ = ("form", "ops")
+
+	def __init__(self, form, ops):
+		self.form = form
+		self.ops = ops
+
+
+class _Compiler:
+	def __init__(self, cached=True):
+		self.ops = []
+		self.cached = cached
+
+	def cache(self):
+		return _new_cache() if self.cached else _uncached
+
+	def emit(self, op, arg=None):
+		self.ops.append((op, arg))
+		return len(self.ops) - 1
+
+	def patch(self, idx, arg):
+		self.ops[idx] = (self.ops[idx][0], arg)
+
+	def form(self, form, tail=None):
+		"""
+		Emits code evaluating a subform,
+		with its own frame unless it is in tail position.
+		"""
+		match form:
+			case Symbol(value=name):
+				self.emit(LOAD, (name, form, tail is not None, self.cache()))
+			case LazyList() if not form.is_parsed:
+				# A body of fn or loop, never in tail position;
+				# compiled only if evaluated, so that compiling the call does not parse it.
+				self.emit(EVALUATE, form)
+			case List() if len(form) > 0:
+				if tail is None:
+					self.emit(ENTER, form)
+					self.call(form, RECORD)
+					self.emit(LEAVE)
+				else:
+					self.emit(RETARGET, form)
+					self.call(form, tail)
+			case _:
+				self.emit(CONST, evaluator.evaluate_simple_form(form, None))
+
+	def call(self, form, tail):
+		"""Emits code evaluating a call form, not including its frame."""
+		head, *args = form
+		if isinstance(head, Symbol):
+			name = head.value
+		elif isinstance(head, Execution):
+			# Builtins put into forms by other builtins, as in wrap_progn.
+			name = _builtin_names.get(head)
+		else:
+			name = None
+		inline = _inline[name](self, args) if name in _inline else None
+
+		end = None
+		if inline is None:
+			self.form(head)
+		elif isinstance(head, Symbol):
+			guard = self.emit(GUARD)
+			inline(tail)
+			end = self.emit(RETURN if tail == ACTIVATION else JUMP)
+			self.patch(guard, (name, head, common.builtin_symbols[name], len(self.ops),
+					self.cache()))
+		else:
+			inline(tail)
+			return
+
+		target = self.emit(TARGET)
+		for arg in args:
+			self.form(arg)
+		self.patch(target, (form, tuple(args), len(self.ops)))
+		self.emit(INVOKE, (form, len(args)))
+		if end is not None and tail != ACTIVATION:
+			self.patch(end, len(self.ops))
+
+
+# Inline versions of builtins: each checks the arguments
+# and returns a function emitting the code if they are handled,
+# otherwise the call is left to the builtin.
+_inline = {}
+
+def _inlines(name):
+	def register(fn):
+		_inline[name] = fn
+		return fn
+	return register
+
+@_inlines("if")
+def _inline_if(c, args):
+	if not 2 <= len(args) <= 3:
+		return None
+	condition, success, *fail = args
+	def emit(tail):
+		c.form(condition)
+		branch = c.emit(BRANCH)
+		c.form(success, tail)
+		end = c.emit(RETURN if tail == ACTIVATION else JUMP)
+		otherwise = len(c.ops)
+		c.form(fail[0] if fail else true, tail)
+		c.patch(branch, (otherwise, len(c.ops)))
+		if tail != ACTIVATION:
+			c.patch(end, len(c.ops))
+	return emit
+
+@_inlines("progn")
+def _inline_progn(c, args):
+	def emit(tail):
+		if len(args) == 0:
+			c.emit(CONST, nil)
+		for i, form in enumerate(args):
+			if i > 0:
+				c.emit(DISCARD)
+			c.form(form, tail if i == len(args) - 1 else None)
+	return emit
+
+@_inlines("def")
+def _inline_def(c, args):
+	if len(args) != 2 or not isinstance(args[0], Symbol):
+		return None
+	def emit(tail):
+		c.form(args[1])
+		c.emit(DEFINE, args[0].value)
+	return emit
+
+
+_builtin_names = {common.builtin_symbols[name]: name for name in _inline}
+
+
+def compile_form(form):
+	"""
+	Compiles the evaluation of a form
+	whose frame is already on top of evaluator.stack.
+	"""
+	c = _Compiler(not (isinstance(form, List) and List.reused(form)))
+	try:
+		match form:
+			case Symbol(value=name):
+				c.emit(LOOKUP, name)
+			case List() if len(form) > 0:
+				c.call(form, ACTIVATION)
+			case _:
+				c.form(form)
+	except RecursionError:
+		# Too deeply nested to compile; the evaluator doesn't mind.
+		c.ops.clear()
+		c.emit(GENERIC, form)
+	c.emit(RETURN)
+	return Code(form, c.ops)
+
+
+# Compiled code by the id of the form; the form is kept to check it's the same.
+_codes = {}
+CACHE_SIZE = 4096
+
+def _code(form):
+	code = _codes.get(id(form))
+	if code is None or code.form is not form:
+		if len(_codes) >= CACHE_SIZE:
+			_codes.clear()
+		code = _codes[id(form)] = compile_form(form)
+	return code.ops
+
+
+# Each LOAD and GUARD caches where its last lookup found the name,
+# as [evaluator.version, index in the maps of the context, number of maps].
+# A site is only ever reached in scopes of the same shape:
+# the same lets and calls, made afresh each time but binding the same names.
+# (Not so for a form that is in several places, as lists made by List.shared
+# can be; code for those gets _uncached, which is never filled.)
+# So while no name was removed and no inner scope had a name added by def
+# (the version is the same), the maps before the index still don't have the name,
+# which is found at the index if it is there at all.
+# Names so added (evaluator.shadowed) are not cached:
+# such a def made in one call need not have been made in another
+# that reaches the same site.
+
+def _new_cache():
+	return [-1, 0, 0]
+
+_uncached = [-1, 0, 0]
+
+_undefined = object()
+
+def _lookup(context, name, cache):
+	maps = context.maps
+	for i, m in enumerate(maps):
+		if name in m:
+			if cache is not _uncached and name not in evaluator.shadowed:
+				cache[:] = evaluator.version, i, len(maps)
+			return m[name]
+	return _undefined
+
+
+# Executions with these evaluate implementations are run directly.
+_builtin_evaluate = common.BuiltinFunction.evaluate
+_user_evaluate = common.UserExecution.Instance.evaluate
+_function_evaluate = builtin.UserFunction.Instance.evaluate
+
+
+def execute(form, context=None):
+	"""Evaluates the form, same as evaluator.evaluate."""
+	stack = evaluator.stack
+	if context is None:
+		context = stack[-1].context
+
+	# An activation runs the code for the frame at index depth of the stack.
+	# The frame is its own, or borrowed from the calling activation
+	# when the activation evaluates a call in place, as a tail call.
+	# afters are those of evaluator.TailCall, run when the activation returns.
+	# Suspended activations are kept in calls.
+	# gen and target are set when the activation waits on a builtin,
+	# with throw holding an error to be sent into it.
+	calls = []
+	depth = len(stack)
+	owns = True
+	afters = None
+	stack.append(Frame(form, context))
+	if tracer.events is not None:
+		tracer.record(tracer.PUSH, len(stack), form)
+	ops = _code(form)
+	pc = 0
+	values = []
+	ctx = context
+	gen = target = throw = tail = None
+
+	while True:
+		try:
+			if gen is not None:
+				try:
+					if throw is None:
+						next(gen)
+					else:
+						error, throw = throw, None
+						gen.throw(error)
+				except StopIteration as stop:
+					result = stop.value
+					if isinstance(result, evaluator.TailCall):
+						tail = result
+					elif isinstance(target, jexec.EvaluateOut):
+						tail = evaluator.TailCall(result, ctx)
+					else:
+						values.append(result)
+					gen = target = None
+				else:
+					# The builtin pushed a frame for us to evaluate.
+					calls.append((ops, pc, values, ctx, gen, target, depth, owns, afters))
+					depth = len(stack) - 1
+					owns = True
+					afters = None
+					frame = stack[-1]
+					ops = _code(frame.form)
+					pc = 0
+					values = []
+					ctx = frame.context
+					gen = target = None
+
+			if tail is not None:
+				# The call on top of the stack evaluates to the form of tail.
+				frame = stack[-1]
+				frame.form = tail.form
+				frame.context = tail.context
+				if ops[pc][0] != RETURN:
+					calls.append((ops, pc, values, ctx, None, None, depth, owns, afters))
+					depth = len(stack) - 1
+					owns = False
+					afters = None
+				if tail.after is not None:
+					if afters is None:
+						afters = [tail.after]
+					elif not afters[-1].absorb(tail.after):
+						afters.append(tail.after)
+				ops = _code(tail.form)
+				pc = 0
+				values = []
+				ctx = tail.context
+				tail = None
+
+			while True:
+				op, arg = ops[pc]
+				pc += 1
+
+				if op == LOAD:
+					name = arg[0]
+					cache = arg[3]
+					maps = ctx.maps
+					if cache[0] == evaluator.version and cache[2] == len(maps)  \
+							and name in (m := maps[cache[1]]):
+						values.append(m[name])
+						continue
+					v = _lookup(ctx, name, cache)
+					if v is _undefined:
+						# Raise with the frame the evaluator would have.
+						if arg[2]:
+							stack[-1].form = arg[1]
+						else:
+							stack.append(Frame(arg[1], ctx))
+							if tracer.events is not None:
+								tracer.record(tracer.PUSH, len(stack), arg[1])
+						ctx[name]
+					values.append(v)
+
+				elif op == CONST:
+					values.append(arg)
+
+				elif op == ENTER:
+					stack.append(Frame(arg, ctx))
+					if tracer.events is not None:
+						tracer.record(tracer.PUSH, len(stack), arg)
+
+				elif op == LEAVE:
+					frame = stack.pop()
+					if tracer.events is not None:
+						tracer.record(tracer.POP, len(stack) + 1, frame.form, values[-1])
+
+				elif op == TARGET:
+					t = values[-1]
+					if not isinstance(t, Execution):
+						raise errors.JimmyError("Invocation target is invalid.", arg[0])
+					if not isinstance(t, jexec.EvaluateIn):
+						values.extend(arg[1])
+						pc = arg[2]
+
+				elif op == INVOKE:
+					n = arg[1]
+					args = values[len(values) - n:]
+					t = values[-n - 1]
+					del values[-n - 1:]
+					try:
+						matched = jexec.fill_parameters(t.parameter_spec, args)
+					except jexec.ArgumentMismatchError:
+						raise errors.ArgumentMismatchError(arg[0]) from None
+
+					evaluate = type(t).evaluate
+					if evaluate is _builtin_evaluate:
+						values.append(t.call(**matched))
+					elif evaluate is _function_evaluate or evaluate is _user_evaluate:
+						if evaluate is _function_evaluate and jit.enabled:
+							result = jit.call(t, matched)
+							if result is not None:
+								values.append(result)
+								continue
+						tail = evaluator.TailCall(t.body, t.closure.new_child(matched))
+						break
+					else:
+						gen = t.evaluate(ctx, **matched)
+						target = t
+						break
+
+				elif op == RETARGET:
+					stack[-1].form = arg
+
+				elif op == GUARD:
+					name, symbol, execution, address, cache = arg
+					maps = ctx.maps
+					if cache[0] == evaluator.version and cache[2] == len(maps)  \
+							and name in (m := maps[cache[1]]):
+						t = m[name]
+					else:
+						t = _lookup(ctx, name, cache)
+						if t is _undefined:
+							stack.append(Frame(symbol, ctx))
+							if tracer.events is not None:
+								tracer.record(tracer.PUSH, len(stack), symbol)
+							ctx[name]
+					if t is not execution:
+						values.append(t)
+						pc = address
+
+				elif op == BRANCH:
+					v = values.pop()
+					if not objects.is_known(v):
+						values.append(UnknownValue())
+						pc = arg[1]
+					elif not common._check_bool(v):
+						pc = arg[0]
+
+				elif op == JUMP:
+					pc = arg
+
+				elif op == DISCARD:
+					values.pop()
+
+				elif op == DEFINE:
+					ctx[arg] = values[-1]
+
+				elif op == RETURN:
+					result = values[-1]
+					if afters is not None:
+						for after in reversed(afters):
+							after.run()
+					if owns:
+						frame = stack.pop()
+						frame.result = result
+						if tracer.events is not None:
+							tracer.record(tracer.POP, len(stack) + 1, frame.form, result)
+					if not calls:
+						return result
+					ops, pc, values, ctx, gen, target, depth, owns, afters = calls.pop()
+					if gen is not None:
+						break
+					values.append(result)
+
+				elif op == LOOKUP:
+					values.append(ctx[arg])
+
+				elif op == GENERIC:
+					frame = stack.pop()
+					values.append(evaluator.evaluate(arg, ctx))
+					stack.append(frame)
+
+				elif op == EVALUATE:
+					calls.append((ops, pc, values, ctx, None, None, depth, owns, afters))
+					stack.append(Frame(arg, ctx))
+					if tracer.events is not None:
+						tracer.record(tracer.PUSH, len(stack), arg)
+					depth = len(stack) - 1
+					owns = True
+					afters = None
+					ops = _code(arg)
+					pc = 0
+					values = []
+
+		except Exception as e:
+			# Like the evaluator, pops the frames one activation at a time,
+			# giving any builtin waiting on one a chance to handle the error.
+			gen = target = tail = None
+			while True:
+				if tracer.events is not None:
+					for frame in reversed(stack[depth:]):
+						tracer.record(tracer.THROW, len(stack), frame.form, e)
+						tracer.record(tracer.POP, len(stack), frame.form, frame.result)
+						stack.pop()
+				del stack[depth:]
+				if not calls:
+					raise
+				ops, pc, values, ctx, gen, target, depth, owns, afters = calls.pop()
+				if gen is not None and isinstance(e, errors.JimmyError):
+					throw = e
+					break
@@ -1,7 +1,74 @@
 def print_usage():
 	import sys
-	print(f"Usage: {sys.argv[0]} [run [filename]]\n"
-	      f"    OR {sys.argv[0]} check [filename]")
+	print(f"Usage: {sys.argv[0]} [run [options] [filename]]\n"
+	      f"    OR {sys.argv[0]} check [options] [filename]\n"
+	      f"    OR {sys.argv[0]} cache prune [--all] [directory...]\n"
+	      f"Options:\n"
+	      f"    --no-cache        do not use or write the parsed form cache\n"
+	      f"    --parallel[=N]    parse large files with N processes\n"
+	      f"    --lazy            parse function bodies only when first used\n"
+	      f"    --engine=vm       (run only) compile to bytecode instead of walking forms\n"
+	      f"    --no-jit          (run only) do not compile hot functions to python\n"
+	      f"    --trace[=N]       record the last N evaluator events,\n"
+	      f"                      dumped on error or SIGUSR1\n"
+	      f"    --trace-file=PATH where to dump the events (.json for Chrome tracing)")
+
+
+def split_options(argv):
+	"""
+	Separates --name and --name=value options from the other arguments.
+	Returns the options as a dict (with True for options without a value)
+	and the list of remaining arguments.
+	"""
+	options = {}
+	args = []
+	for arg in argv:
+		if arg.startswith("--"):
+			name, has_value, value = arg[2:].partition("=")
+			options[name] = value if has_value else True
+		else:
+			args.append(arg)
+	return options, args
+
+
+def apply_common_options(options):
+	"""
+	Applies the options shared by run and check.
+	Returns False if there is an unrecognized option.
+	"""
+	import jim.cache
+	import jim.tracer
+	for name, value in options.items():
+		match name, value:
+			case "no-cache", True:
+				jim.cache.enabled = False
+			case "parallel", True:
+				import os
+				jim.cache.parallel = os.cpu_count() or 1
+			case "parallel", str() if value.isdigit():
+				jim.cache.parallel = int(value)
+			case "lazy", True:
+				jim.cache.lazy = True
+			case "trace", True:
+				jim.tracer.enable()
+			case "trace", str() if value.isdigit():
+				jim.tracer.enable(int(value))
+			case "trace-file", str():
+				jim.tracer.path = value
+			case _:
+				return False
+	return True
+
+
+def prune_cache(argv):
+	import jim.cache
+	options, dirs = split_options(argv)
+	if not set(options) <= {"all"}:
+		print_usage()
+		return
+	for d in dirs or ["."]:
+		for path in jim.cache.prune(d, everything="all" in options):
+			print("removed", path)
 
 
 def main(argv):
@@ -15,6 +82,8 @@ def main(argv):
 		case [name, "check", *rest]:
 			from jim import checker
 			checker.main(rest)
+		case [name, "cache", "prune", *rest]:
+			prune_cache(rest)
 		case [name, *args]:
 			print_usage()
 		case _:
@@ -1,4 +1,13 @@
+import sys
+import weakref
+from array import array
+from collections.abc import Sequence
+import jim.printer as printer
+
+
 class _ValueMixin:
+	__slots__ = ("value",)
+
 	def __init__(self, value, *args, **kws):
 		self.value = value
 		super().__init__(*args, **kws)
@@ -20,6 +29,8 @@ class _ValueMixin:
 
 
 class LanguageObject:
+	__slots__ = ()
+
 	def __hash__(self):
 		pass
 
@@ -29,6 +40,8 @@ class LanguageObject:
 
 class Form(LanguageObject):
 	"""Notably, comments are language objects but are not forms."""
+	__slots__ = ()
+
 	def equal(self, other):
 		# The concept of equality within the language,
 		# which may be changed in the future.
@@ -36,12 +49,15 @@ class Form(LanguageObject):
 
 
 class Atom(_ValueMixin, Form):
+	__slots__ = ()
+
 	def __init__(self, value):
 		super().__init__(value=value)
 
 
 class _Nil(Atom):
 	"""Special singleton nil object."""
+	__slots__ = ()
 	def __init__(self):
 		super().__init__(None)
 	def __repr__(self):
@@ -52,10 +68,11 @@ nil = _Nil()
 
 
 class Bool(Atom):
-	pass
+	__slots__ = ()
 
 class _True(Bool):
 	"""Special singleton true object."""
+	__slots__ = ()
 	def __init__(self):
 		super().__init__(True)
 	def __repr__(self):
@@ -68,6 +85,7 @@ true = _True()
 
 class _False(Bool):
 	"""Special singleton false object."""
+	__slots__ = ()
 	def __init__(self):
 		super().__init__(False)
 	def __repr__(self):
@@ -87,15 +105,58 @@ def known_and_true(v):
 
 
 class Integer(Atom):
-	pass
+	__slots__ = ()
+	# Small integers are shared, much like they are in Python itself.
+	_small = {}
+
+	def __new__(cls, value):
+		self = Integer._small.get(value)
+		if self is None or type(self) is not cls:
+			self = super().__new__(cls)
+			self.value = value
+		return self
+
+	def __init__(self, value):
+		pass  # Initialized by __new__.
+
+	def __reduce__(self):
+		return type(self), (self.value,)
+
+for i in range(-5, 257):
+	Integer._small[i] = Integer(i)
+del i
 
 
 class Symbol(Atom):
+	# Symbols are interned: there is only ever one symbol with a given name,
+	# so symbols compare and hash by identity.
+	__slots__ = ()
+	_interned = {}
+
+	def __new__(cls, value):
+		self = Symbol._interned.get(value)
+		if self is None:
+			self = super().__new__(cls)
+			self.value = sys.intern(value)
+			# setdefault in case another thread interned the same name meanwhile.
+			self = Symbol._interned.setdefault(self.value, self)
+		return self
+
+	def __init__(self, value):
+		pass  # Initialized by __new__.
+
+	__eq__ = object.__eq__
+	__hash__ = object.__hash__
+
+	def __reduce__(self):
+		return Symbol, (self.value,)
+
 	def __repr__(self):
 		return self.value  # Don't want quotes around symbol names.
 
 
 class String(Atom):
+	__slots__ = ()
 	_str_escape = str.maketrans({
 		'"': '\\"',
 		"\\": "\\\\"})
@@ -104,6 +165,8 @@ class String(Atom):
 
 
 class Execution(Atom):
+	__slots__ = ("parameter_spec",)
+
 	def __init__(self, parameter_spec):
 		super().__init__(self)
 		self.parameter_spec = tuple(parameter_spec)
@@ -118,6 +181,13 @@ class Execution(Atom):
 	def __hash__(self):
 		return object.__hash__(self)
 
+	def captures_mutable(self, checking):
+		"""
+		Whether the execution holds on to a mutable object, as closures can.
+		checking is passed on from is_mutable.
+		"""
+		return False
+
 	def evaluate(self, calling_context, **locals):
 		# Technically, we don't need locals, as that can exist as another context
 		# on top of the provided context.
@@ -129,6 +199,7 @@ class Execution(Atom):
 
 
 class UnknownValue(Atom):
+	__slots__ = ("id",)
 	_next_id = 0
 	def __init__(self):
 		super().__init__(self)
@@ -153,20 +224,365 @@ def is_known(value):
 	return not isinstance(value, UnknownValue)
 
 
-class List(list, Form):
+# Lists are persistent vectors, as in Clojure: the elements are kept in a tree
+# of tuples with up to 32 children per node, and the last up to 32 elements
+# in a separate tail. Changing or appending an element copies only the path
+# to it, and the rest of a list is the same tree starting one element later.
+# Most forms are short enough to only ever have a tail.
+_BITS = 5
+_WIDTH = 1 << _BITS
+_MASK = _WIDTH - 1
+
+
+def _new_path(level, node):
+	while level > 0:
+		node = (node,)
+		level -= _BITS
+	return node
+
+
+def _push_tail(size, level, parent, tail):
+	idx = ((size - 1) >> level) & _MASK
+	if level == _BITS:
+		child = tail
+	elif idx < len(parent):
+		child = _push_tail(size, level - _BITS, parent[idx], tail)
+	else:
+		child = _new_path(level - _BITS, tail)
+	return parent[:idx] + (child,) + parent[idx + 1:]
+
+
+def _assoc_node(level, node, i, value):
+	idx = (i >> level) & _MASK
+	if level > 0:
+		value = _assoc_node(level - _BITS, node[idx], i, value)
+	return node[:idx] + (value,) + node[idx + 1:]
+
+
+class List(Form):
+	"""
+	Lists are immutable, so the structural hash is computed once and kept.
+	Lists made with List.shared are hash-consed:
+	structurally equal lists made that way are the same object.
+	"""
+	__slots__ = ("_size", "_shift", "_root", "_tail", "_start",
+			"_hash", "_mutable", "__weakref__")
+	_shared = weakref.WeakValueDictionary()
+	# Those shared lists that were made more than once, by id;
+	# looked up without hashing, which would parse any lazy elements.
+	_reused = weakref.WeakValueDictionary()
+
 	def __init__(self, elements=None):
-		list.__init__(self, [] if elements is None else elements)
 		Form.__init__(self)
-		self.elements = self  # to make this work with match statements
+		self._fill(() if elements is None else tuple(elements))
+
+	def _fill(self, elements):
+		size = len(elements)
+		tail_start = (size - 1) & ~_MASK if size > 0 else 0
+		nodes = tuple(elements[i:i + _WIDTH] for i in range(0, tail_start, _WIDTH))
+		shift = _BITS
+		while len(nodes) > _WIDTH:
+			nodes = tuple(nodes[i:i + _WIDTH] for i in range(0, len(nodes), _WIDTH))
+			shift += _BITS
+		self._size, self._shift, self._root = size, shift, nodes
+		self._tail, self._start = elements[tail_start:], 0
+		self._hash = self._mutable = None
+
+	@staticmethod
+	def _make(size, shift, root, tail, start):
+		lst = object.__new__(List)
+		lst._size, lst._shift, lst._root = size, shift, root
+		lst._tail, lst._start = tail, start
+		lst._hash = lst._mutable = None
+		return lst
+
+	@classmethod
+	def shared(cls, elements):
+		# Keyed by hash alone; on a collision the newer list takes the slot.
+		lst = List(elements)
+		h = hash(lst)
+		other = List._shared.get(h)
+		if other is not None and other == lst:
+			List._reused[id(other)] = other
+			return other
+		List._shared[h] = lst
+		return lst
+
+	@staticmethod
+	def reused(lst):
+		"""
+		Whether lst was made by shared more than once,
+		and so may stand for several places in the code.
+		"""
+		return List._reused.get(id(lst)) is lst
+
+	def __reduce__(self):
+		# The cached hash depends on symbol identities and must not be carried over.
+		return List, (list(self),)
+
+	def _leaf(self, i):
+		"""The node holding the element at i, counted from the start of the tree."""
+		if i >= self._size - len(self._tail):
+			return self._tail
+		node = self._root
+		for level in range(self._shift, 0, -_BITS):
+			node = node[(i >> level) & _MASK]
+		return node
+
+	def _tuple(self):
+		if self._size == len(self._tail):
+			return self._tail[self._start:]
+		return tuple(self)
+
+	def __len__(self):
+		return self._size - self._start
+
+	def __iter__(self):
+		tail_start = self._size - len(self._tail)
+		if self._start == 0 and tail_start == 0:
+			return iter(self._tail)
+		return self._iter_tree(tail_start)
+
+	def _iter_tree(self, tail_start):
+		i = self._start
+		while i < tail_start:
+			yield from self._leaf(i)[i & _MASK:]
+			i = (i | _MASK) + 1
+		yield from self._tail[i - tail_start:]
+
+	def __reversed__(self):
+		return reversed(self._tuple())
+
+	def __getitem__(self, index):
+		if isinstance(index, slice):
+			start, stop, step = index.indices(len(self))
+			if step == 1 and stop == len(self):
+				# A suffix shares the whole tree.
+				return List._make(self._size, self._shift, self._root, self._tail,
+						self._start + min(start, stop))
+			return List(self[i] for i in range(start, stop, step))
+		if index < 0:
+			index += len(self)
+		if not 0 <= index < len(self):
+			raise IndexError("list index out of range")
+		i = index + self._start
+		return self._leaf(i)[i & _MASK]
+
+	def assoc(self, index, value):
+		"""Returns a copy of the list with the element at index replaced."""
+		if index < 0:
+			index += len(self)
+		if not 0 <= index < len(self):
+			raise IndexError("list assignment index out of range")
+		i = index + self._start
+		root, tail = self._root, self._tail
+		tail_start = self._size - len(tail)
+		if i >= tail_start:
+			j = i - tail_start
+			tail = tail[:j] + (value,) + tail[j + 1:]
+		else:
+			root = _assoc_node(self._shift, root, i, value)
+		return List._make(self._size, self._shift, root, tail, self._start)
+
+	def __add__(self, other):
+		"""Appends the elements of other; the list itself is not copied."""
+		size, shift, root = self._size, self._shift, self._root
+		tail = list(self._tail)
+		for value in other:
+			if len(tail) == _WIDTH:
+				full = tuple(tail)
+				if (size >> _BITS) > (1 << shift):
+					root = (root, _new_path(shift, full))
+					shift += _BITS
+				else:
+					root = _push_tail(size, shift, root, full)
+				tail = []
+			tail.append(value)
+			size += 1
+		return List._make(size, shift, root, tuple(tail), self._start)
+
+	def __radd__(self, other):
+		# As with a plain list, e.g. [x] + lst.
+		return other + list(self)
+
+	def index(self, value):
+		return self._tuple().index(value)
+
+	def count(self, value):
+		return self._tuple().count(value)
+
+	@property
+	def elements(self):
+		return self  # to make this work with match statements
+	# None of the following recurse through nested lists,
+	# so that arbitrarily deep lists can be handled.
 	def __repr__(self):
-		return '(' + " ".join(map(repr, self)) + ')'
+		return printer.format_form(self, repr)
 	def __str__(self):
-		return '(' + " ".join(map(str, self)) + ')'
+		return printer.format_form(self, str)
 	def __hash__(self):
 		# To allow usage as dict keys.
-		return hash(tuple(self))
+		if self._hash is None:
+			# Nested lists are hashed first, innermost last in order.
+			order = []
+			pending = [self]
+			while pending:
+				lst = pending.pop()
+				order.append(lst)
+				pending.extend(e for e in lst if isinstance(e, List) and e._hash is None)
+			for lst in reversed(order):
+				lst._hash = hash(lst._tuple())
+		return self._hash
+	def __eq__(self, other):
+		if self is other:
+			return True
+		if isinstance(other, List):
+			return _lists_equal(self, other)
+		if type(other) is list:
+			return list(self) == other
+		return NotImplemented
+	def __ne__(self, other):
+		eq = self.__eq__(other)
+		return eq if eq is NotImplemented else not eq
+	def __contains__(self, item):
+		pending = [self]
+		while pending:
+			lst = pending.pop()
+			if item in lst._tuple():
+				return True
+			for e in lst:
+				if isinstance(e, List):
+					pending.append(e)
+				elif item in e:
+					return True
+		return False
+
+	@property
+	def head(self):
+		return self[0] if len(self) > 0 else nil
+
+	@property
+	def rest(self):
+		return self[1:] if len(self) > 0 else List()
+
+def _lists_equal(a, b):
+	pending = [(a, b)]
+	while pending:
+		a, b = pending.pop()
+		if a is b:
+			continue
+		# Hashes can't tell lists apart: some elements (executions)
+		# are equal to others that do not hash the same.
+		if len(a) != len(b):
+			return False
+		for x, y in zip(a, b):
+			if isinstance(x, List) and isinstance(y, List):
+				pending.append((x, y))
+			elif not (x is y or x == y):
+				return False
+	return True
+
+
+# Lets match statements take lists apart with sequence patterns.
+Sequence.register(List)
+
+
+class MutableList(list, Form):
+	"""
+	An array updated in place, unlike List.
+	Its contents can change at any time, so it is only ever equal to itself.
+	"""
+	__slots__ = ()
+
+	__eq__ = object.__eq__
+	__ne__ = object.__ne__
+	__hash__ = object.__hash__
+
+	def __add__(self, other):
+		return MutableList([*self, *other])
+
+	def assoc(self, index, value):
+		"""Returns a changed copy, leaving this one as it is."""
+		copy = MutableList(self)
+		copy[index] = value
+		return copy
+
+	def __repr__(self):
+		return printer.format_form(self, repr)
+	def __str__(self):
+		return printer.format_form(self, str)
+
+	@property
+	def head(self):
+		return self[0] if len(self) > 0 else nil
+
+	@property
+	def rest(self):
+		return MutableList(self[1:])
+
+
+class IntVector(Form):
+	"""
+	An immutable vector of integers, kept unboxed in an array of 64-bit values,
+	or in a tuple of Python ints once a value does not fit.
+	Elements only become Integer objects when read one by one.
+	"""
+	__slots__ = ("values",)
+
+	def __init__(self, values):
+		if not isinstance(values, (array, tuple, list, range)):
+			values = list(values)
+		try:
+			self.values = array("q", values)
+		except OverflowError:
+			self.values = tuple(values)
+
+	def __len__(self):
+		return len(self.values)
+
+	def __iter__(self):
+		return map(Integer, self.values)
+
+	def __getitem__(self, index):
+		if isinstance(index, slice):
+			return IntVector(self.values[index])
+		return Integer(self.values[index])
+
+	def assoc(self, index, value):
+		if not isinstance(value, Integer):
+			return List(self).assoc(index, value)
+		values = list(self.values)
+		values[index] = value.value
+		return IntVector(values)
+
+	def __add__(self, other):
+		if isinstance(other, IntVector):
+			return IntVector([*self.values, *other.values])
+		return List(self) + other
+
+	def __eq__(self, other):
+		if isinstance(other, List):
+			# Equal to the list of the same integers, which hashes the same.
+			return len(other) == len(self.values) and all(
+					isinstance(e, Integer) and e.value == v
+					for e, v in zip(other, self.values))
+		if not isinstance(other, IntVector):
+			return False
+		if type(self.values) is type(other.values):
+			return self.values == other.values
+		return list(self.values) == list(other.values)
+	def __ne__(self, other):
+		return not self == other
+	def __hash__(self):
+		return hash(tuple(self.values))
+
 	def __contains__(self, item):
-		return super().__contains__(item) or any(item in e for e in self.elements)
+		return isinstance(item, Integer) and item.value in self.values
+
+	def __repr__(self):
+		return '(' + " ".join(map(str, self.values)) + ')'
+	def __str__(self):
+		return repr(self)
 
 	@property
 	def head(self):
@@ -174,15 +590,224 @@ class List(list, Form):
 
 	@property
 	def rest(self):
-		return List(self[1:]) if len(self) > 0 else List()
+		return self[1:]
+
+
+# Maps are hash array mapped tries, as in Clojure.
+# Each level of the trie takes the next 5 bits of the key hash.
+# A node only has slots for the children that exist, as marked in its bitmap.
+# A child is an entry, a tuple of (hash, key, value), or another node.
+# Keys whose hashes are entirely equal share a collision node.
+
+class _Node:
+	__slots__ = ("bitmap", "children")
+
+	def __init__(self, bitmap, children):
+		self.bitmap = bitmap
+		self.children = children
+
+
+class _Collision:
+	__slots__ = ("hash", "entries")
+
+	def __init__(self, hash, entries):
+		self.hash = hash
+		self.entries = entries
+
+
+def _same_key(a, b):
+	return a is b or a == b
+
+
+def _pair(a, a_hash, b, shift):
+	"""A node holding both a and b, which differ in hash or key."""
+	b_hash = b[0]
+	if a_hash == b_hash:
+		entries = a.entries if isinstance(a, _Collision) else (a,)
+		return _Collision(a_hash, entries + (b,))
+	a_idx = (a_hash >> shift) & _MASK
+	b_idx = (b_hash >> shift) & _MASK
+	if a_idx == b_idx:
+		return _Node(1 << a_idx, (_pair(a, a_hash, b, shift + _BITS),))
+	children = (a, b) if a_idx < b_idx else (b, a)
+	return _Node((1 << a_idx) | (1 << b_idx), children)
+
+
+def _child_hash(child):
+	return child.hash if isinstance(child, _Collision) else child[0]
+
+
+def _find(node, h, key, default):
+	shift = 0
+	while True:
+		if isinstance(node, _Collision):
+			if node.hash == h:
+				for entry in node.entries:
+					if _same_key(entry[1], key):
+						return entry[2]
+			return default
+		bit = 1 << ((h >> shift) & _MASK)
+		if not node.bitmap & bit:
+			return default
+		child = node.children[(node.bitmap & (bit - 1)).bit_count()]
+		if isinstance(child, tuple):
+			return child[2] if child[0] == h and _same_key(child[1], key) else default
+		node = child
+		shift += _BITS
+
+
+def _assoc(node, shift, entry):
+	"""Returns the node with the entry added or replaced, and whether it was added."""
+	h, key = entry[0], entry[1]
+	if isinstance(node, _Collision):
+		if node.hash != h:
+			return _pair(node, node.hash, entry, shift), True
+		for i, old in enumerate(node.entries):
+			if _same_key(old[1], key):
+				entries = node.entries[:i] + (entry,) + node.entries[i + 1:]
+				return _Collision(h, entries), False
+		return _Collision(h, node.entries + (entry,)), True
+
+	bit = 1 << ((h >> shift) & _MASK)
+	idx = (node.bitmap & (bit - 1)).bit_count()
+	children = node.children
+	if not node.bitmap & bit:
+		return _Node(node.bitmap | bit, children[:idx] + (entry,) + children[idx:]), True
+	child = children[idx]
+	if isinstance(child, tuple):
+		if child[0] == h and _same_key(child[1], key):
+			child, added = entry, False
+		else:
+			child, added = _pair(child, child[0], entry, shift + _BITS), True
+	else:
+		child, added = _assoc(child, shift + _BITS, entry)
+	return _Node(node.bitmap, children[:idx] + (child,) + children[idx + 1:]), added
+
+
+def _dissoc(node, shift, h, key):
+	"""
+	Returns the node without the key: None if nothing is left,
+	or a lone entry to be moved up into the parent.
+	"""
+	if isinstance(node, _Collision):
+		entries = tuple(e for e in node.entries if not _same_key(e[1], key))
+		return entries[0] if len(entries) == 1 else _Collision(h, entries)
+
+	bit = 1 << ((h >> shift) & _MASK)
+	idx = (node.bitmap & (bit - 1)).bit_count()
+	child = node.children[idx]
+	if isinstance(child, tuple):
+		child = None
+	else:
+		child = _dissoc(child, shift + _BITS, h, key)
+	if child is None:
+		bitmap = node.bitmap & ~bit
+		children = node.children[:idx] + node.children[idx + 1:]
+	else:
+		bitmap = node.bitmap
+		children = node.children[:idx] + (child,) + node.children[idx + 1:]
+	if len(children) == 0:
+		return None
+	if len(children) == 1 and isinstance(children[0], tuple) and shift > 0:
+		return children[0]
+	return _Node(bitmap, children)
+
+
+def _entries(node):
+	pending = [node]
+	while pending:
+		node = pending.pop()
+		if isinstance(node, tuple):
+			yield node
+		elif isinstance(node, _Collision):
+			yield from node.entries
+		else:
+			pending.extend(node.children)
+
+
+class Map(Form):
+	"""
+	An immutable hash map from forms to values.
+	Keys are hashed and compared with the hash and equality of the forms.
+	Iterating over a map gives its keys.
+	"""
+	__slots__ = ("_root", "_size", "_hash", "_mutable")
+
+	def __init__(self, items=()):
+		self._root, self._size, self._hash = _Node(0, ()), 0, None
+		self._mutable = None
+		for key, value in items:
+			self._add((hash(key), key, value))
+
+	def _add(self, entry):
+		self._root, added = _assoc(self._root, 0, entry)
+		self._size += added
+
+	def _derive(self, root, size):
+		m = object.__new__(Map)
+		m._root, m._size, m._hash = root, size, None
+		m._mutable = None
+		return m
+
+	def __len__(self):
+		return self._size
+
+	def get(self, key, default=None):
+		return _find(self._root, hash(key), key, default)
+
+	def __contains__(self, key):
+		missing = object()
+		return self.get(key, missing) is not missing
 
+	def assoc(self, key, value):
+		"""Returns a map with the key set to value."""
+		root, added = _assoc(self._root, 0, (hash(key), key, value))
+		return self._derive(root, self._size + added)
 
-#class MutableList(List):
-#	def __init__(self, elements=None):
-#		super().__init__(elements)
+	def dissoc(self, key):
+		"""Returns a map without the key."""
+		if key not in self:
+			return self
+		root = _dissoc(self._root, 0, hash(key), key)
+		if root is None:
+			root = _Node(0, ())
+		return self._derive(root, self._size - 1)
+
+	def items(self):
+		return ((key, value) for _, key, value in _entries(self._root))
+
+	def keys(self):
+		return (key for _, key, _ in _entries(self._root))
+
+	def values(self):
+		return (value for _, _, value in _entries(self._root))
+
+	def __iter__(self):
+		return self.keys()
+
+	def __eq__(self, other):
+		if self is other:
+			return True
+		if not isinstance(other, Map) or len(self) != len(other):
+			return False
+		missing = object()
+		return all(other.get(key, missing) == value for key, value in self.items())
+	def __ne__(self, other):
+		return not self == other
+	def __hash__(self):
+		if self._hash is None:
+			self._hash = hash(frozenset(self.items()))
+		return self._hash
+
+	def __repr__(self):
+		return printer.format_form(self, repr)
+	def __str__(self):
+		return printer.format_form(self, str)
 
 
 class Comment(_ValueMixin, LanguageObject):
+	__slots__ = ()
+
 	def __init__(self, content):
 		super().__init__(value=content)
 	def __str__(self):
@@ -209,59 +834,115 @@ def filter_tree(criterion, tree):
 	iterable of children.
 	If the root fails the criterion, None is returned.
 	"""
-
-	_REMOVED = object()
-
-	def not_removed(x):
-		return x is not _REMOVED
-
-	def _filter_tree(tree):
-		if not criterion(tree):
-			return _REMOVED
-		if is_leaf(tree):
-			return tree
-		else:
-			return type(tree)(filter(not_removed, map(_filter_tree, tree)))
-
-	filtered = _filter_tree(tree)
-	if filtered is _REMOVED:
+	if not criterion(tree):
 		return None
-	return filtered
+	if is_leaf(tree):
+		return tree
+
+	# Each entry is a node being rebuilt, its children yet to be visited,
+	# and the children kept so far.
+	pending = [(tree, iter(tree), [])]
+	while True:
+		node, children, kept = pending[-1]
+		for child in children:
+			if not criterion(child):
+				continue
+			if is_leaf(child):
+				kept.append(child)
+			else:
+				pending.append((child, iter(child), []))
+				break
+		else:
+			pending.pop()
+			rebuilt = type(node)(kept)
+			if len(pending) == 0:
+				return rebuilt
+			pending[-1][2].append(rebuilt)
 
 
 def tree_equal(u, v, eq=lambda u, v: u == v):
 	#from jim.debug import debug
 	#debug(f"tree_equal: eq({u=!s}, {v=!s})={eq(u,v)}")
-	if eq(u, v):
-		return True
-
-	is_u_leaf = is_leaf(u)
-	is_v_leaf = is_leaf(v)
-
-	if is_u_leaf != is_v_leaf:
-		return False
-	if is_u_leaf:  # Both leaves, but already not equal.
-		return False
-
+	# Pairs of children still to compare, innermost last.
+	pending = [iter([(u, v)])]
 	try:
-		return all(tree_equal(x, y, eq) for x, y in zip(u, v, strict=True))
+		while pending:
+			for u, v in pending[-1]:
+				if u is v or eq(u, v):
+					continue
+
+				if isinstance(u, Map) or isinstance(v, Map):
+					if not (isinstance(u, Map) and isinstance(v, Map)) or len(u) != len(v):
+						return False
+					pending.append(_map_value_pairs(u, v))
+					break
+
+				is_u_leaf = is_leaf(u)
+				is_v_leaf = is_leaf(v)
+
+				if is_u_leaf != is_v_leaf:
+					return False
+				if is_u_leaf:  # Both leaves, but already not equal.
+					return False
+
+				pending.append(zip(u, v, strict=True))
+				break
+			else:
+				pending.pop()
+		return True
 	except ValueError:
 		return False
 
 
-def is_mutable(form):
-	"""A form is considered mutable if any part of it could be mutated."""
-#	if isinstance(form, MutableList):
-#		return True
-	if is_leaf(form):
-		return False
-	return any(map(is_mutable, form))
+def _map_value_pairs(u, v):
+	missing = object()
+	for key, value in u.items():
+		yield value, v.get(key, missing)
+
+
+def is_mutable(form, checking=None):
+	"""
+	A form is considered mutable if any part of it could be mutated.
+	checking holds the closures being checked further up,
+	which are taken to be immutable so that cycles end.
+	The answer is kept on lists and maps, which can't change it,
+	unless it rests on such an assumption.
+	"""
+	if checking is None:
+		checking = set()
+	root = form
+	mutable = False
+	pending = [form]
+	while pending:
+		form = pending.pop()
+		if isinstance(form, MutableList):
+			mutable = True
+			break
+		if isinstance(form, IntVector):
+			continue
+		if isinstance(form, (List, Map)) and form._mutable is not None:
+			if form._mutable:
+				mutable = True
+				break
+			continue
+		if isinstance(form, Map):
+			pending.extend(form.keys())
+			pending.extend(form.values())
+		elif isinstance(form, Execution):
+			if form.captures_mutable(checking):
+				mutable = True
+				break
+		elif not is_leaf(form):
+			pending.extend(form)
+	if isinstance(root, (List, Map)) and (mutable or not checking):
+		root._mutable = mutable
+	return mutable
 
 
 __all__ = [
 	*(cls.__name__ for cls in [
 		LanguageObject, Form,
 		Atom, Bool, Integer, Symbol, String, Execution, UnknownValue,
-		List, #MutableList,
+		List, MutableList, IntVector, Map,
 		Comment]),
 	"nil", "true", "false"]
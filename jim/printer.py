@@ -0,0 +1,81 @@
+"""
+Writes forms out piece by piece,
+without first building the whole string in memory.
+"""
+
+import io
+from itertools import chain
+import jim.objects as objects
+
+
+# Number of pieces collected before they are written out.
+CHUNK_PARTS = 1024
+
+_end = object()
+
+
+def _open(form):
+	match form:
+		case objects.List() | objects.MutableList() | objects.IntVector():
+			return "(", iter(form), ")", 1
+		case objects.Map():
+			return "{", chain.from_iterable(form.items()), "}", 2
+		case _:
+			return None
+
+
+def write_form(form, file, format=str, max_depth=None, max_length=None):
+	"""
+	Writes form to file the same as format (str or repr) would.
+	Lists nested deeper than max_depth are written as "(...)",
+	and elements past the first max_length of a list as "...".
+	"""
+	parts = []
+	pending = []
+	need_space = False
+	node = form
+	while node is not _end:
+		if need_space:
+			parts.append(" ")
+		opened = _open(node)
+		if opened is None:
+			parts.append(format(node))
+			need_space = True
+		else:
+			opening, elements, closing, width = opened
+			if max_depth is not None and len(pending) >= max_depth:
+				parts.append(opening + "..." + closing)
+				need_space = True
+			else:
+				parts.append(opening)
+				limit = None if max_length is None else max_length * width
+				pending.append([elements, closing, limit])
+				need_space = False
+
+		if len(parts) >= CHUNK_PARTS:
+			file.write("".join(parts))
+			parts.clear()
+
+		node = _end
+		while pending:
+			frame = pending[-1]
+			node = next(frame[0], _end)
+			if node is not _end:
+				if frame[2] is None:
+					break
+				if frame[2] > 0:
+					frame[2] -= 1
+					break
+				parts.append(" ..." if need_space else "...")
+				node = _end
+			pending.pop()
+			parts.append(frame[1])
+			need_space = True
+
+	file.write("".join(parts))
+
+
+def format_form(form, format=str, max_depth=None, max_length=None):
+	out = io.StringIO()
+	write_form(form, out, format, max_depth, max_length)
+	return out.getvalue()
@@ -1,11 +1,12 @@
-from contextlib import contextmanager
+import os
+import re
 from string import whitespace, digits, ascii_letters
-from functools import wraps, cache
+from bisect import bisect_right
+from functools import wraps, partial
 from dataclasses import dataclass
 from typing import Any
 
 from jim.objects import *
-import jim.objects as objects
 
 
 _SPACES = set(whitespace)
@@ -13,37 +14,15 @@ _DIGITS = set(digits)
 _SEPARATORS = set("()") | _SPACES | {""}
 
 
-# The parser is unfortunately stateful...
-_line_num = 1
-_buffer = []
-_next_char = 0
-
-@contextmanager
-def fresh_reader_state():
-	# This exists for the load function.
-	global _line_num, _buffer, _next_char
-
-	_line_num_save = _line_num
-	_buffer_save = _buffer
-	_next_char_save = _next_char
-
-	_line_num = 1
-	_buffer = []
-	_next_char = 0
-
-	try:
-		yield
-	finally:
-		_line_num = _line_num_save
-		_buffer = _buffer_save
-		_next_char = _next_char_save
+# Characters are pulled from the source in chunks of about this size.
+CHUNK_SIZE = 1 << 16
 
 
 class ParseError(Exception):
-	def __init__(self, msg):
-		super().__init__()
+	def __init__(self, msg, line):
+		super().__init__(msg, line)  # args are needed to pickle the error
 		self.msg = msg
-		self.line = _line_num
+		self.line = line
 	def __str__(self):
 		return f"Parse error on line {self.line}: {self.msg}"
 
@@ -57,22 +36,21 @@ class ParseResult:
 
 def _component_parser(parse_function):
 	@wraps(parse_function)
-	def component_parser_wrapper(char_source):
-		global _next_char
-		bookmark = _next_char
+	def component_parser_wrapper(reader, *args):
+		bookmark = reader._next_char
 
 		# parse logic:
-		out = parse_function(char_source)
+		out = parse_function(reader, *args)
 		#   if the parse function gave a manual adjustment, use that
 		if out.chars_consumed_adj is not None:
-			_next_char += out.chars_consumed_adj
+			reader._next_char += out.chars_consumed_adj
 		#   otherwise, if parsing failed, drop back to bookmark
 		elif not out.success:
-			_next_char = bookmark
+			reader._next_char = bookmark
 
 		#print(f"DEBUG: {parse_function.__name__}: ", end="")
 		#if out.success:
-		#	print(f"consumed '{''.join(_buffer[bookmark:_next_char])}'")
+		#	print(f"consumed '{reader._text()[bookmark:reader._next_char]}'")
 		#else:
 		#	print("failed")
 
@@ -80,151 +58,523 @@ def _component_parser(parse_function):
 	return component_parser_wrapper
 
 
-def wrap_char_source(get_next_char):
+def string_source(s):
+	"""Makes a chunk source function over an in-memory string."""
+	chunks = iter((s,))
+	return lambda: next(chunks, "")
+
+
+class Reader:
 	"""
-	Wraps the character source function into a generator.
+	Parses forms out of a chunk source function.
 
-	The character source function should not raise errors for EOF,
-	and should instead return the empty string.
+	The source function may return any number of characters per call,
+	e.g. f.read(CHUNK_SIZE) or f.readline for interactive input.
+	It should not raise errors for EOF, and should instead return the empty string.
+
+	All parser state lives on the instance,
+	so any number of readers can be used at once (including from different threads).
+
+	Comments are skipped over like whitespace unless comments is set,
+	in which case they are kept as Comment objects in the forms produced.
 	"""
 
-	def char_gen():
-		global _next_char, _line_num
+	def __init__(self, get_next_chunk, comments=False):
+		self.get_next_chunk = get_next_chunk
+		self.comments = comments
+		# _chunks holds the characters read but not yet committed to a top-level form,
+		# as read (appending to one string would copy it for every chunk of a long form);
+		# _starts has the offset of each chunk, and _length their total.
+		# _next_char indexes into the chunks, and _read_upto marks how far into them
+		# the parser has looked (which is where line numbers are reported from).
+		# _line_base is the line number at the start of the chunks.
+		self._line_base = 1
+		self._chunks = []
+		self._starts = []
+		self._length = 0
+		# The chunk last read from, and its offset.
+		self._chunk, self._chunk_start = "", 0
+		self._next_char = 0
+		self._read_upto = 0
+		self._eof = False
+		self.chars = self._char_gen()
+
+	def __iter__(self):
 		while True:
-			while _next_char >= len(_buffer):
-				c = get_next_char()
-				if c == '\n':
-					_line_num += 1
-				_buffer.append(c)
-
-			out = _buffer[_next_char]
-			_next_char += 1
+			form = self.parse()
+			if form is None:
+				break
+			self._commit()
+			yield form
+
+	@property
+	def line_num(self):
+		return self._line_base + self._text().count("\n", 0, self._read_upto)
+
+	def error(self, msg):
+		return ParseError(msg, self.line_num)
+
+	def _text(self):
+		"""Joins the chunks into one, returning it."""
+		if len(self._chunks) > 1:
+			self._chunks = ["".join(self._chunks)]
+			self._starts = [0]
+			self._chunk, self._chunk_start = self._chunks[0], 0
+		return self._chunks[0] if self._chunks else ""
+
+	def _char_gen(self):
+		while True:
+			i = self._next_char
+			chunk, start = self._chunk, self._chunk_start
+			if not start <= i < start + len(chunk):
+				if i >= self._length:
+					chunk = "" if self._eof else self.get_next_chunk()
+					if chunk == "":
+						# EOF is reported (repeatedly) as the empty string,
+						# but is not stored in the buffer.
+						self._eof = True
+						self._next_char += 1
+						self._read_upto = max(self._read_upto, self._next_char)
+						yield ""
+						continue
+					self._chunks.append(chunk)
+					self._starts.append(self._length)
+					self._length += len(chunk)
+				# Backtracking can go back to an earlier chunk.
+				k = bisect_right(self._starts, i) - 1
+				chunk, start = self._chunk, self._chunk_start =  \
+						self._chunks[k], self._starts[k]
+
+			out = chunk[i - start]
+			self._next_char += 1
+			if self._next_char > self._read_upto:
+				self._read_upto = self._next_char
 			yield out
-	return char_gen()
 
+	def _commit(self):
+		"""
+		Drops the consumed part of the buffer once a top-level form is complete,
+		so that memory held is bounded by the largest form rather than the source.
+		The buffer is only rebuilt once the consumed part dominates it,
+		keeping the copying linear in the source size.
+		"""
+		consumed = self._next_char
+		if consumed < CHUNK_SIZE and 2 * consumed < self._length:
+			return
+		text = self._text()
+		self._line_base += text.count("\n", 0, consumed)
+		self._chunks = [text[consumed:]]
+		self._starts = [0]
+		self._chunk, self._chunk_start = self._chunks[0], 0
+		self._length = len(self._chunks[0])
+		self._read_upto -= consumed
+		self._next_char = 0
 
-@cache
-def _lookahead1(c):
 	@_component_parser
-	def lookahead(chars):
-		return ParseResult(next(chars) == c)
-	return lookahead
+	def _lookahead(self, c):
+		return ParseResult(next(self.chars) == c)
 
+	def parse(self):
+		self.skip_whitespace()
+		if self._lookahead("").success:  # empty string indicates EOF
+			return None
+		return self.parse_form().result
 
-def parse(chars):
-	skip_whitespace(chars)
-	if _lookahead1("")(chars).success:  # empty string indicates EOF
-		return None
-	return parse_form(chars).result
+	@_component_parser
+	def skip_whitespace(self):
+		chars = self.chars
+		while True:
+			c = next(chars)
+			if c in _SPACES:
+				continue
+			if c == ';' and not self.comments:
+				for c in chars:
+					if c == '\n' or c == "":
+						break
+				continue
+			return ParseResult(True, chars_consumed_adj=-1)
 
+	@_component_parser
+	def parse_form(self):
+		order = [
+			Reader.parse_comment,
+			Reader.parse_list,
+			Reader.parse_string,
+			Reader.parse_integer,
+			Reader.parse_symbol]
+
+		self.skip_whitespace()
+		for parse_function in order:
+			out = parse_function(self)
+			if out.success:
+				# adjustment already applied by wrapper
+				return ParseResult(True, out.result)
+
+		raise self.error("Invalid form.")
 
-def load_forms(get_next_char, comments=False):
-	chars = wrap_char_source(get_next_char)
-	while True:
-		form = parse(chars)
-		if form is None:
-			break
-		yield objects.filter_tree(lambda f: not isinstance(f, Comment), form)
+	@_component_parser
+	def parse_list(self):
+		if next(self.chars) != '(':
+			return ParseResult(False)
+		forms = []
+		while True:
+			self.skip_whitespace()
+			if self._lookahead(')').success:
+				break
+			forms.append(self.parse_form().result)
+		return ParseResult(True, List(forms))
 
+	@_component_parser
+	def parse_comment(self):
+		chars = self.chars
+		if next(chars) != ';':
+			return ParseResult(False)
+		msg = []
+		for c in chars:
+			if c == '\n' or c == "":
+				break
+			msg.append(c)
+		return ParseResult(True, Comment("".join(msg)))
 
-@_component_parser
-def skip_whitespace(chars):
-	while next(chars) in _SPACES:
-		pass
-	return ParseResult(True, chars_consumed_adj=-1)
+	@_component_parser
+	def parse_integer(self):
+		chars = self.chars
+		num_str = []
+		c = next(chars)
+		if c == '+' or c == '-':
+			num_str.append(c)
+			c = next(chars)
 
+		if c not in _DIGITS:
+			return ParseResult(False)
+		num_str.append(c)
 
-@_component_parser
-def parse_form(chars):
-	order = [
-		parse_comment,
-		parse_list,
-		parse_string,
-		parse_integer,
-		parse_symbol]
+		for c in chars:
+			if c not in _DIGITS:
+				# Digits ended. Only accept as integer if we ended on a separator
+				# (i.e., not in the middle of a weird identifier).
+				if c not in _SEPARATORS:
+					return ParseResult(False)
+				break
+			num_str.append(c)
+		return ParseResult(True, Integer(int("".join(num_str))), -1)
 
-	skip_whitespace(chars)
-	for parse_function in order:
-		out = parse_function(chars)
-		if out.success:
-			# adjustment already applied by wrapper
-			return ParseResult(True, out.result)
+	@_component_parser
+	def parse_string(self):
+		chars = self.chars
+		if next(chars) != '"':
+			return ParseResult(False)
+
+		s = []
+		for c in chars:
+			if c == '"':
+				break
+			if c == '\\':  # escape
+				c = next(chars)
+			if c == "":
+				raise self.error("Unterminated string literal.")
+			s.append(c)
+		return ParseResult(True, String("".join(s)))
 
-	raise ParseError("Invalid form.")
+	@_component_parser
+	def parse_symbol(self):
+		s = []
+		chars = self.chars
+		c = next(chars)
+		if c == '"':  # That would be a string.
+			return ParseResult(False)
+		self._next_char -= 1
+		for c in chars:
+			if c in _SEPARATORS:
+				break
+			s.append(c)
+		if len(s) > 0:
+			return ParseResult(True, Symbol("".join(s)), -1)
+		return ParseResult(False)
 
 
-@_component_parser
-def parse_list(chars):
-	if next(chars) != '(':
-		return ParseResult(False)
-	forms = []
+# The scanning backend: one regex match per token over the whole buffer.
+# Every alternative mirrors a component parser of Reader, tried in the same order.
+_SCAN_PATTERN = r"""
+	[ \t\n\r\x0b\x0c]*
+	(?:
+		(?P<open>\()
+	|	(?P<close>\))
+	|	;(?P<comment>[^\n]*)\n?
+	|	"(?P<string>[^"\\]*(?:\\.[^"\\]*)*)"
+	|	(?P<unterminated>")
+	|	(?P<integer>[+-]?[0-9]+)(?=[ \t\n\r\x0b\x0c()]|\Z)
+	|	(?P<symbol>[^ \t\n\r\x0b\x0c()]+)
+	|	(?P<eof>\Z)
+	)"""
+_SCAN_FLAGS = re.VERBOSE | re.DOTALL
+_scan_token = {
+	str: re.compile(_SCAN_PATTERN, _SCAN_FLAGS).match,
+	bytes: re.compile(_SCAN_PATTERN.encode(), _SCAN_FLAGS).match}
+_scan_unescape = {
+	str: partial(re.compile(r"\\(.)", re.DOTALL).sub, r"\1"),
+	bytes: partial(re.compile(rb"\\(.)", re.DOTALL).sub, rb"\1")}
+
+
+def scan_forms(buffer, comments=False, lazy=False, share=False):
+	"""
+	Parses all forms out of a complete in-memory buffer in a single pass,
+	producing the same forms and errors as the streaming Reader
+	(including the handling of comments).
+	The buffer can be a str or any bytes-like object (e.g. bytes or mmap),
+	in which case it is taken to be UTF-8.
+
+	If share is set, structurally equal lists are made the same object
+	(see List.shared). This saves memory on repetitive code
+	at some cost in parsing time.
+	If lazy is set, the body forms of fn and loop are left as LazyList,
+	to be parsed only when they are first used.
+	"""
+	if isinstance(buffer, str):
+		match_token = _scan_token[str]
+		unescape = _scan_unescape[str]
+		decode = bytes_or_str = str
+		backslash, newline = "\\", "\n"
+	else:
+		match_token = _scan_token[bytes]
+		unescape = _scan_unescape[bytes]
+		decode = lambda s: s.decode("utf-8")
+		bytes_or_str = bytes
+		backslash, newline = b"\\", b"\n"
+
+	def error(msg, pos):
+		# Same as Reader.line_num: the parser has looked one character past pos.
+		return ParseError(msg, 1 + bytes_or_str(buffer[:pos + 1]).count(newline))
+
+	# Lazy lists would be parsed to be hashed, so they are not shared.
+	make_list = List.shared if share and not lazy else List
+
+	open_lists = []  # elements of each list not yet closed, innermost last
+	pos = 0
 	while True:
-		skip_whitespace(chars)
-		if _lookahead1(')')(chars).success:
-			break
-		forms.append(parse_form(chars).result)
-	return ParseResult(True, List(forms))
+		m = match_token(buffer, pos)
+		token = m.lastgroup
+		pos = m.end()
+
+		# Roughly in order of frequency.
+		if token == "symbol":
+			form = Symbol(decode(m.group(token)))
+		elif token == "open":
+			if lazy and _is_lazy_body(open_lists):
+				start = m.start(token)
+				end = next(_list_ends(buffer, start), None)
+				# A list that does not close properly is parsed now,
+				# so that the error is reported where it is.
+				if end is not None:
+					open_lists[-1].append(LazyList(buffer[start:end], comments))
+					pos = end
+					continue
+			open_lists.append([])
+			continue
+		elif token == "close":
+			if len(open_lists) == 0:
+				raise error("Invalid form.", m.start(token))
+			form = make_list(open_lists.pop())
+		elif token == "integer":
+			form = Integer(int(m.group(token)))
+		elif token == "string":
+			s = m.group(token)
+			if backslash in s:
+				s = unescape(s)
+			form = String(decode(s))
+		elif token == "comment":
+			if not comments:
+				continue
+			form = Comment(decode(m.group(token)))
+		elif token == "unterminated":
+			raise error("Unterminated string literal.", len(buffer))
+		else:  # eof
+			if len(open_lists) > 0:
+				raise error("Invalid form.", len(buffer))
+			return
+
+		if len(open_lists) > 0:
+			open_lists[-1].append(form)
+		else:
+			yield form
+
+
+# Everything that can appear between parentheses, skipped over in bulk:
+# whitespace, symbols and integers, strings and comments.
+_PRESCAN_PATTERN = r"""(?:
+		[ \t\n\r\x0b\x0c]+
+	|	[^ \t\n\r\x0b\x0c()";][^ \t\n\r\x0b\x0c()]*
+	|	"[^"\\]*(?:\\.[^"\\]*)*"
+	|	;[^\n]*
+	)*"""
+_prescan_skip = {
+	str: re.compile(_PRESCAN_PATTERN, _SCAN_FLAGS).match,
+	bytes: re.compile(_PRESCAN_PATTERN.encode(), _SCAN_FLAGS).match}
+
+
+def _list_ends(buffer, pos):
+	"""
+	Walks the lists from pos onwards, yielding the position right after
+	each list that is at the outermost level (relative to pos).
+	Stops early at anything that would be a parse error,
+	leaving it for the parser to report.
+	"""
+	skip = _prescan_skip[str if isinstance(buffer, str) else bytes]
+	open_paren, close_paren = ("(", ")") if isinstance(buffer, str) else (b"(", b")")
+	depth = 0
+	pos = skip(buffer, pos).end()
+	while pos < len(buffer):
+		c = buffer[pos:pos + 1]
+		if c == open_paren:
+			depth += 1
+		elif c == close_paren and depth > 0:
+			depth -= 1
+			if depth == 0:
+				yield pos + 1
+		else:  # Unmatched ) or unterminated string.
+			return
+		pos = skip(buffer, pos + 1).end()
+
+
+def top_level_boundaries(buffer):
+	"""
+	Finds the positions in the buffer right after each top-level list,
+	which are safe places to split the buffer for parsing.
+	"""
+	return list(_list_ends(buffer, 0))
 
 
-@_component_parser
-def parse_comment(chars):
-	if next(chars) != ';':
-		return ParseResult(False)
-	msg = []
-	for c in chars:
-		if c == '\n' or c == "":
-			break
-		msg.append(c)
-	return ParseResult(True, Comment("".join(msg)))
-
-
-@_component_parser
-def parse_integer(chars):
-	num_str = []
-	c = next(chars)
-	if c == '+' or c == '-':
-		num_str.append(c)
-		c = next(chars)
+# Lists headed by these are parsed lazily past the first two elements
+# (the parameters, or loop variables), which makes up the body.
+_LAZY_HEADS = {"fn", "loop"}
 
-	if c not in _DIGITS:
-		return ParseResult(False)
-	num_str.append(c)
+def _is_lazy_body(open_lists):
+	if len(open_lists) == 0:
+		return False
+	elements = open_lists[-1]
+	return len(elements) >= 2  \
+			and isinstance(elements[0], Symbol) and elements[0].value in _LAZY_HEADS
 
-	for c in chars:
-		if c not in _DIGITS:
-			# Digits ended. Only accept as integer if we ended on a separator
-			# (i.e., not in the middle of a weird identifier).
-			if c not in _SEPARATORS:
-				return ParseResult(False)
-			break
-		num_str.append(c)
-	return ParseResult(True, Integer(int("".join(num_str))), -1)
+
+class LazyList(List):
+	"""
+	A list form that keeps its source text and is only parsed on first use.
+	Any access to the elements parses them in place,
+	so a LazyList is otherwise indistinguishable from the List it holds.
+	"""
+	__slots__ = ("_source", "_comments")
+
+	def __init__(self, source, comments=False):
+		super().__init__()
+		self._source = source
+		self._comments = comments
+
+	def force(self):
+		if self._source is not None:
+			form, = scan_forms(self._source, self._comments, lazy=True)
+			self._fill(tuple(form))
+			self._source = None
+		return self
+
+	@property
+	def is_parsed(self):
+		return self._source is None
+
+	def __reduce__(self):
+		# Stays unparsed when sent to another process.
+		if self._source is not None:
+			return LazyList, (self._source, self._comments)
+		return List, (list(self),)
+
+def _forcing(method):
+	@wraps(method)
+	def forcing_method(self, *args):
+		# The internals of other lists are accessed directly, so force them too.
+		for obj in (self, *args):
+			if isinstance(obj, LazyList) and obj._source is not None:
+				obj.force()
+		return method(self, *args)
+	return forcing_method
+
+for name in [
+		"__len__", "__iter__", "__reversed__", "__getitem__", "__contains__",
+		"__eq__", "__ne__", "__hash__", "__add__", "__radd__",
+		"__repr__", "__str__", "_tuple", "assoc", "index", "count"]:
+	setattr(LazyList, name, _forcing(getattr(List, name)))
+
+
+def _scan_chunk(chunk, line_offset, comments, lazy):
+	"""
+	Parses one chunk in a worker process.
+	Returns the forms and the error ending the chunk, if any.
+	"""
+	forms = []
+	try:
+		forms.extend(scan_forms(chunk, comments, lazy))
+	except ParseError as e:
+		return forms, ParseError(e.msg, e.line + line_offset)
+	return forms, None
 
 
-@_component_parser
-def parse_string(chars):
-	if next(chars) != '"':
-		return ParseResult(False)
+# Buffers smaller than this are not worth sending to other processes.
+PARALLEL_THRESHOLD = 1 << 20
 
-	s = []
-	for c in chars:
-		if c == '"':
-			break
-		if c == '\\':  # escape
-			c = next(chars)
-		if c == "":
-			raise ParseError("Unterminated string literal.")
-		s.append(c)
-	return ParseResult(True, String("".join(s)))
-
-
-@_component_parser
-def parse_symbol(chars):
-	s = []
-	for c in chars:
-		if c in _SEPARATORS:
-			break
-		s.append(c)
-	if len(s) > 0:
-		return ParseResult(True, Symbol("".join(s)), -1)
-	return ParseResult(False)
+def parallel_scan_forms(buffer, comments=False, lazy=False, workers=None,
+		threshold=PARALLEL_THRESHOLD):
+	"""
+	Same as scan_forms, but splits a large buffer at top-level forms
+	and parses the pieces in a pool of worker processes.
+	The forms are produced in source order, and errors report
+	the line numbers of the whole buffer.
+	"""
+	if workers is None:
+		workers = os.cpu_count() or 1
+	if len(buffer) < threshold or workers <= 1:
+		yield from scan_forms(buffer, comments, lazy)
+		return
+
+	# Aim for a few chunks per worker to even out the load.
+	chunk_size = max(len(buffer) // (4 * workers), 1)
+	starts = [0]
+	for pos in top_level_boundaries(buffer):
+		if pos - starts[-1] >= chunk_size:
+			starts.append(pos)
+	ends = starts[1:] + [len(buffer)]
+
+	newline = "\n" if isinstance(buffer, str) else b"\n"
+	line_offsets = []
+	line = 0
+	previous = 0
+	for start in starts:
+		line += buffer[previous:start].count(newline)
+		line_offsets.append(line)
+		previous = start
+
+	from concurrent.futures import ProcessPoolExecutor
+	with ProcessPoolExecutor(workers) as pool:
+		results = pool.map(_scan_chunk,
+				(buffer[start:end] for start, end in zip(starts, ends)),
+				line_offsets, [comments] * len(starts), [lazy] * len(starts))
+		for forms, error in results:
+			yield from forms
+			if error is not None:
+				raise error
+
+
+_BACKENDS = {"stream", "scan"}
+
+def load_forms(get_next_chunk, comments=False, backend="stream", lazy=False):
+	"""
+	Produces the top-level forms from the chunk source.
+	The "stream" backend parses incrementally as chunks arrive;
+	the "scan" backend reads the whole source first, then uses scan_forms,
+	which is much faster for bulk loading but not suitable for interactive input.
+	Lazy parsing (see scan_forms) is only available with the scan backend.
+	"""
+	if backend not in _BACKENDS:
+		raise ValueError(f"Unknown reader backend: {backend}")
+	if lazy and backend != "scan":
+		raise ValueError("Lazy parsing needs the scan backend.")
+	if backend == "scan":
+		return scan_forms("".join(iter(get_next_chunk, "")), comments, lazy)
+	return iter(Reader(get_next_chunk, comments))
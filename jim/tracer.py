@@ -0,0 +1,94 @@
+"""
+Records evaluator events into a fixed-size ring buffer,
+to be dumped after an error or on SIGUSR1.
+
+Events are kept as tuples of (time in ns, kind, stack depth, form, detail)
+and only formatted when dumped, so recording is cheap enough to leave on.
+A dump is written as text, or as Chrome trace-event JSON
+if the file name ends with ".json".
+"""
+
+from collections import deque
+from time import perf_counter_ns
+import json
+import signal
+
+import jim.printer as printer
+
+
+PUSH = "push"
+POP = "pop"
+THROW = "throw"
+VMAP = "vmap"
+
+DEFAULT_SIZE = 65536
+
+# None while recording is disabled.
+events = None
+path = "jim-trace.txt"
+
+# Forms in a dump are cut down to this size.
+_MAX_DEPTH = 4
+_MAX_LENGTH = 8
+
+
+def enable(size=DEFAULT_SIZE):
+	global events
+	events = deque(maxlen=size)
+	if hasattr(signal, "SIGUSR1"):
+		signal.signal(signal.SIGUSR1, lambda signum, frame: dump())
+
+
+def disable():
+	global events
+	events = None
+
+
+def record(kind, depth, form, detail=None):
+	events.append((perf_counter_ns(), kind, depth, form, detail))
+
+
+def _format(obj):
+	if isinstance(obj, Exception):
+		return f"{type(obj).__name__}: {getattr(obj, 'msg', obj)}"
+	return printer.format_form(obj, repr, _MAX_DEPTH, _MAX_LENGTH)
+
+
+def write_text(file):
+	start = events[0][0] if events else 0
+	for time, kind, depth, form, detail in events:
+		line = f"{(time - start) / 1000:12.1f}us {kind:<5} {depth:>4} {_format(form)}"
+		if detail is not None:
+			line += f" -> {_format(detail)}"
+		file.write(line + "\n")
+
+
+def write_chrome(file):
+	def event(time, kind, depth, form, detail):
+		e = {"name": _format(form), "ts": time / 1000, "pid": 0, "tid": 0}
+		match kind:
+			case "push":
+				e["ph"] = "B"
+			case "pop":
+				e["ph"] = "E"
+				e["args"] = {"result": _format(detail)}
+			case _:
+				e["ph"] = "i"
+				e["s"] = "t"
+				e["cat"] = kind
+				e["args"] = {"detail": _format(detail), "depth": depth}
+		return e
+
+	json.dump({"traceEvents": [event(*e) for e in events]}, file)
+
+
+def dump(to=None):
+	"""Writes the recorded events to the given path, or the default path."""
+	if events is None:
+		return
+	to = to or path
+	with open(to, "w") as file:
+		if to.endswith(".json"):
+			write_chrome(file)
+		else:
+			write_text(file)
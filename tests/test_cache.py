@@ -0,0 +1,48 @@
+import os
+
+import jim.cache as cache
+from jim.reader import load_forms, string_source
+
+
+SOURCE = '(def x (list 1 -2 "three" four))\n; comment\n(print x)\n'
+
+
+def write(path, text):
+	path.write_text(text)
+	return str(path)
+
+
+def test_roundtrip(tmp_path, monkeypatch):
+	path = write(tmp_path / "a.jim", SOURCE)
+	expected = list(load_forms(string_source(SOURCE)))
+
+	assert list(cache.load_forms(path)) == expected
+	assert os.path.exists(cache.cache_path(path))
+	# Second load comes from the cache, without parsing.
+	def scan_forms(*args, **kws):
+		raise AssertionError("parsed again")
+	monkeypatch.setattr(cache.reader, "scan_forms", scan_forms)
+	assert list(cache.load_forms(path)) == expected
+
+
+def test_stale_entry_is_ignored(tmp_path):
+	path = write(tmp_path / "a.jim", SOURCE)
+	list(cache.load_forms(path))
+	write(tmp_path / "a.jim", "(print 2)")
+	assert list(cache.load_forms(path)) == list(load_forms(string_source("(print 2)")))
+
+
+def test_incomplete_parse_is_not_cached(tmp_path):
+	path = write(tmp_path / "a.jim", "(a)\n(b")
+	forms = cache.load_forms(path)
+	next(forms)
+	assert not os.path.exists(cache.cache_path(path))
+
+
+def test_prune(tmp_path):
+	path = write(tmp_path / "a.jim", SOURCE)
+	list(cache.load_forms(path))
+	assert cache.prune(tmp_path) == []
+	os.remove(path)
+	assert cache.prune(tmp_path) == [cache.cache_path(path)]
+	assert not os.path.exists(tmp_path / cache.CACHE_DIR)
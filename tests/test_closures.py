@@ -0,0 +1,61 @@
+import pytest
+
+from jim import reader
+from jim.objects import Integer, List
+import jim.evaluator.evaluator as evaluator
+import jim.interpreter.evaluator as interpreter
+
+
+def run(source):
+	evaluator.stack.clear()
+	evaluator.init_evaluator()
+	for form in reader.scan_forms(source):
+		result = interpreter.evaluate(form)
+	return result
+
+
+def test_captures_only_free_variables():
+	f = run("(def unused 0) (let (x 1 y 2) (fn (a) (+ a x)))")
+	assert set(f.closure.maps[0]) == {"+", "x", "*recur*"}
+
+
+def test_captured_values_are_a_snapshot():
+	assert run("(def x 1) (def f (fn () x)) (def x 2) (f)") == Integer(1)
+	assert run("(def x 1) (def f (fn () (progn (def x 3) x))) (list (f) x)") \
+			== run("(list 3 1)")
+
+
+def test_load_captures_everything():
+	f = run("(def unused 0) (fn () (load \"x.jim\"))")
+	assert "unused" in f.closure
+
+
+def test_flattened_copies_keep_shadowing():
+	context = evaluator.DeepCopyChainMap({"x": 3}, {"x": 2, "y": 2}, {"x": 1, "z": 1},
+			evaluator.NilContext())
+	for copy in (context.copy(), context.capture(["x", "y", "z"])):
+		assert len(copy.maps) == 2
+		assert (copy["x"], copy["y"], copy["z"]) == (3, 2, 1)
+
+	assert run("(def x 1) (def f (let (x 2) (let (x 3) (fn () x)))) (f)") == Integer(3)
+	# Copied whole rather than captured.
+	assert run("(def x 1) (def f (let (x 2) (let (x 3) (fn () (if false (load \"x.jim\") x))))) (f)")  \
+			== Integer(3)
+
+
+
+@pytest.mark.parametrize("engine", ["tree", "vm"])
+def test_lazy_body_stays_unparsed(engine):
+	evaluator.stack.clear()
+	evaluator.init_evaluator()
+	interpreter.engine = engine
+	try:
+		forms = list(reader.scan_forms(
+				"(def g 1) (def f (fn (x) (list g x) (list g x x))) (f 2)", lazy=True))
+		bodies = forms[1][2][2:]
+		interpreter.evaluate(forms[0])
+		interpreter.evaluate(forms[1])
+		assert [body.is_parsed for body in bodies] == [False, False]
+		assert interpreter.evaluate(forms[2]) == List([Integer(1), Integer(2), Integer(2)])
+	finally:
+		interpreter.engine = "tree"
@@ -0,0 +1,87 @@
+import pytest
+
+from jim import reader
+from jim.objects import Integer, List, Symbol, is_known
+import jim.evaluator.evaluator as evaluator
+from jim.evaluator.errors import JimmyError
+import jim.interpreter.evaluator as interpreter
+import jim.tracer as tracer
+
+
+def run(source, builtins=None):
+	evaluator.stack.clear()
+	evaluator.init_evaluator(builtins)
+	for form in reader.scan_forms(source):
+		result = interpreter.evaluate(form)
+	return result
+
+
+def pushes(setup, source):
+	"""The forms pushed to evaluate source, after setup."""
+	run(setup)
+	tracer.enable()
+	try:
+		for form in reader.scan_forms(source):
+			interpreter.evaluate(form)
+		return [e[3] for e in tracer.events if e[1] == tracer.PUSH]
+	finally:
+		tracer.disable()
+
+
+def test_leaves_are_evaluated_in_place():
+	source = "(list 1 x (* x 3) \"s\")"
+	form, = reader.scan_forms(source)
+	assert pushes("(def x 2)", source) == [form, form[3]]
+
+
+def test_undefined_argument_has_its_frame():
+	with pytest.raises(JimmyError) as e:
+		run("(def f (fn (x) (+ x y))) (f 1)")
+	assert e.value.stackframes[-1].form is Symbol("y")
+	assert str(e.value.stackframes[-2].form) == "(+ x y)"
+
+
+@pytest.fixture
+def checker():
+	# Importing the checker puts its frames in place for good;
+	# they are only wanted for the test.
+	import jim.checker.evaluator as checker
+	import jim.checker.builtin as builtin
+	evaluator.Stackframe = checker.Stackframe
+	checker.vmap.clear()
+	try:
+		yield checker, builtin.builtin_symbols
+	finally:
+		evaluator.Stackframe = checker.Stackframe.__base__
+		checker.vmap.clear()
+
+
+def test_checker_frames_keep_immediate_forms(checker):
+	checker, builtins = checker
+	assert not checker.Stackframe.inline_leaves
+	assert checker.Stackframe.keeps_immediate_form
+	run("(def a 1) (def b 2) (+ a (* b 1))", builtins)
+	# Only known through the immediate form, with the arguments evaluated.
+	plus = builtins["+"]
+	assert checker.vmap[List([plus, Integer(1), Integer(2)])] == Integer(3)
+
+
+# Each changes a mutable list in a call, then asserts on what the call left.
+_mutations = [
+	"(def set0 (fn (A) (assoc! A 0 42))) (def l (mlist 1 2 3)) (set0 l)"
+	" (assert (= (get l 0) 42)) (get l 1)",
+	# Only the first call is checked through the body.
+	"(def l (mlist 0 2)) (def inc (fn () (assoc! l 0 (+ (get l 0) 1)))) (inc) (inc)"
+	" (assert (= (get l 0) 2)) (get l 1)",
+]
+
+@pytest.mark.parametrize("source", _mutations)
+def test_run_mutation(source):
+	assert run(source) == Integer(2)
+
+@pytest.mark.parametrize("source", _mutations)
+def test_checker_forgets_mutated_lists(checker, source):
+	checker, builtins = checker
+	# The assertion is taken as given rather than contradicted,
+	# and the other elements are no longer known either.
+	assert not is_known(run(source, builtins))
@@ -0,0 +1,68 @@
+import re
+import pytest
+
+from jim import reader
+import jim.evaluator.evaluator as evaluator
+from jim.evaluator.errors import JimmyError, format_error
+import jim.interpreter.evaluator as interpreter
+import jim.interpreter.jit as jit
+
+
+# Each program makes a call in {warm ...} enough times
+# for the function to be compiled, then calls it once more.
+PROGRAMS = [
+	"(def f (fn (n) (if (< n 2) n (+ (*recur* (- n 1)) (*recur* (- n 2)))))) {warm (f 3)} (f 15)",
+	"(def f (fn (n acc) (if (= n 0) acc (*recur* (- n 1) (+ acc n))))) {warm (f 3 0)} (f 3000 0)",
+	"(def f (fn (x (y 10) (more)) (list x y more))) {warm (f 1 2 3)} (list (f 1) (f 1 2) (f 1 2 3 4))",
+	"(def f (fn (x) (let (a (* x 2) b (+ a 1)) (list a b (- b))))) {warm (f 1)} (f 7)",
+	"(def f (fn (x) (postcond (>= *result* 0) (precond (number? x) (* x x))))) {warm (f 1)} (f -3)",
+	"(def f (fn (x) (precond (number? x) x))) {warm (f 1)} (f \"a\")",
+	"(def g (fn (x) (* 2 x))) (def f (fn (x) (+ (g x) (g (g x))))) {warm (f 1)} (f 5)",
+	"(def f (fn (h x) (h x x))) {warm (f + 1)} (list (f + 3) (f list 4) (f (fn (a b) (- a b)) 1))",
+	"(def f (fn (x) (if (< x 5) x (+ x \"s\")))) {warm (f 1)} (f 9)",
+	"(def f (fn (x) (if (< x 5) 1 2))) {warm (f 1)} (def u) (f u)",
+	"(def f (fn (x) (if x 1 2))) {warm (f true)} (f 3)",
+	"(def f (fn (x) (/ 1 x))) {warm (f 1)} (f 0)",
+	"(def f (fn (x) (get x 1))) (def m (mlist 1 2 3)) {warm (f m)} (assoc! m 1 42) (f m)",
+	"(def f (fn (x) (print x))) {warm (f 1)} (f 1)",
+	"(def f (fn (n) (if (= n 0) 0 (+ 1 (*recur* (- n 1)))))) {warm (f 1)} (f 3000)",
+	"(def f (fn (x) (undefined x))) (f 1)",
+	"(def f (fn (a b) a)) {warm (f 1 2)} (f 1)",
+]
+
+
+def warm(match):
+	return f"(def i 0) (loop (i) (if (< i {jit.THRESHOLD}) (progn {match[1]} (*recur* (+ i 1)))))"
+
+
+def run(enabled, source):
+	jit.enabled = enabled
+	evaluator.stack.clear()
+	evaluator.init_evaluator()
+	results = []
+	try:
+		for form in reader.scan_forms(re.sub(r"\{warm (.*?)\}", warm, source)):
+			results.append(interpreter.evaluate(form))
+	except JimmyError as e:
+		results.append(format_error(e))
+	finally:
+		jit.enabled = True
+	return results
+
+
+@pytest.mark.parametrize("source", PROGRAMS)
+def test_same_as_interpreted(source, capsys):
+	interpreted = run(False, source)
+	interpreted_output = capsys.readouterr()
+	compiled = run(True, source)
+	def text(results):
+		return [re.sub("0x[0-9a-f]+|unk[0-9]+", "?", str(r)) for r in results]
+	assert text(compiled) == text(interpreted)
+	assert capsys.readouterr() == interpreted_output
+
+
+def test_compiles_hot_functions():
+	run(True, "(def f (fn (x) (+ x 1))) (def g (fn (x) (print x))) {warm (list (f 1) (g 1))}")
+	context = evaluator.stack[0].context
+	assert callable(context["f"].compiled)
+	assert context["g"].compiled is False
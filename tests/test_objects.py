@@ -0,0 +1,194 @@
+import pytest
+
+from jim.objects import *
+from jim.objects import is_mutable
+from jim.reader import scan_forms
+import jim.evaluator.errors as errors
+from jim.evaluator.evaluator import init_evaluator
+from jim.interpreter.evaluator import evaluate
+
+
+def test_list_is_immutable():
+	lst = List([Integer(1), Integer(2)])
+	for mutate in [
+			lambda: lst.append(Integer(3)),
+			lambda: lst.__setitem__(0, Integer(3)),
+			lambda: lst.pop()]:
+		with pytest.raises(AttributeError):
+			mutate()
+	with pytest.raises(TypeError):
+		lst[0] = Integer(3)
+	assert list(lst) == [Integer(1), Integer(2)]
+
+
+def test_list_equality_ignores_hashes():
+	class Builtin(Execution):
+		pass
+	# Equal by type, but hashed by identity.
+	a, b = List([Integer(1), List([Builtin([])])]), List([Integer(1), List([Builtin([])])])
+	hash(a), hash(b)
+	assert a == b and not a != b
+
+
+def test_persistent_list():
+	n = 1000
+	lst = List(map(Integer, range(n)))
+	assert list(lst) == list(map(Integer, range(n)))
+	assert [lst[i] for i in range(n)] == list(lst)
+	assert lst[-1] == Integer(n - 1)
+
+	rest = lst[1:]
+	assert len(rest) == n - 1 and rest[0] == Integer(1)
+	assert rest == List(map(Integer, range(1, n)))
+
+	changed = rest.assoc(500, Symbol("x"))
+	assert changed[500] is Symbol("x") and rest[500] == Integer(501)
+	assert list(changed) == [*lst[1:501], Symbol("x"), *lst[502:]]
+
+	longer = rest + List(map(Integer, range(n, 2 * n)))
+	assert longer == List(map(Integer, range(1, 2 * n)))
+	assert len(rest) == n - 1
+
+
+def test_shared_lists():
+	a = List.shared([Symbol("+"), Integer(1), List.shared([Symbol("x")])])
+	b = List.shared([Symbol("+"), Integer(1), List.shared([Symbol("x")])])
+	assert a is b
+	assert hash(a) == hash(List([Symbol("+"), Integer(1), List([Symbol("x")])]))
+	assert List.shared([Integer(2)]) is not List.shared([Integer(3)])
+
+
+def test_shared_reader():
+	x, y = scan_forms("(f (g 1) (g 1)) (g 1)", share=True)
+	assert x[1] is x[2] is y
+	assert x == List([Symbol("f"), List([Symbol("g"), Integer(1)]), y])
+
+
+def test_mutable_list():
+	a = MutableList([Integer(1), Integer(2)])
+	copy = a.assoc(0, Integer(3))
+	a[1] = Integer(4)
+	assert list(a) == [Integer(1), Integer(4)]
+	assert list(copy) == [Integer(3), Integer(2)]
+	assert a != MutableList(a) and a == a
+	assert is_mutable(List([Integer(1), List([a])]))
+	assert not is_mutable(List([Integer(1), List([Integer(2)])]))
+
+
+def test_int_vector():
+	v = IntVector(range(5))
+	assert list(v) == list(map(Integer, range(5)))
+	assert v[1:] == IntVector([1, 2, 3, 4]) and v[-1] == Integer(4)
+	assert v.assoc(0, Integer(9)) == IntVector([9, 1, 2, 3, 4])
+	assert v.assoc(0, nil) == List([nil, *v[1:]])
+
+	big = IntVector([1, 1 << 70])
+	assert isinstance(big.values, tuple)
+	assert big == IntVector([1, 1 << 70]) and big[1] == Integer(1 << 70)
+	# Vectors stand in for lists of integers.
+	lst = List([Integer(1), Integer(2)])
+	assert IntVector([1, 2]) == lst and lst == IntVector([1, 2])
+	assert hash(IntVector([1, 2])) == hash(lst)
+	assert IntVector([1, 2]) != List([Integer(1), String("2")])
+	assert List([lst]) == List([IntVector([1, 2])])
+
+
+def test_map():
+	keys = [Integer(i) for i in range(100)] + [Symbol("a"), String("a"), List([Symbol("a")])]
+	m = Map()
+	for i, key in enumerate(keys):
+		m = m.assoc(key, Integer(i))
+	assert len(m) == len(keys)
+	assert all(m.get(key) == Integer(i) for i, key in enumerate(keys))
+	assert m.get(Integer(1000)) is None
+
+	smaller = m.dissoc(Symbol("a"))
+	assert Symbol("a") not in smaller and Symbol("a") in m
+	assert len(smaller) == len(m) - 1
+	assert smaller.assoc(Symbol("a"), Integer(100)) == m
+	assert Map(reversed(list(m.items()))) == m
+
+	assert is_mutable(Map([(Integer(1), MutableList())]))
+	assert not is_mutable(m)
+
+
+def test_deep_nesting():
+	from jim.objects import filter_tree, tree_equal
+
+	def nested(depth):
+		form = List([Symbol("a")])
+		for _ in range(depth - 1):
+			form = List([Symbol("a"), form])
+		return form
+
+	depth = 10 ** 5
+	u, v = nested(depth), nested(depth)
+	assert hash(u) == hash(v) and u == v and tree_equal(u, v)
+	assert Symbol("b") not in u and not is_mutable(u)
+	assert repr(u) == "(a " * (depth - 1) + "(a" + ")" * depth
+	expected = List()
+	for _ in range(depth - 1):
+		expected = List([expected])
+	assert filter_tree(lambda node: node != Symbol("a"), u) == expected
+
+
+@pytest.mark.parametrize("source, expected", [
+	("(list? (ivec 1 2))", true),
+	("(= (ivec 1 2) (list 1 2))", true),
+	("(v+ (ivec 1 2) (ivec 3 4))", IntVector([4, 6])),
+	("(v- 10 (ivec 1 2))", IntVector([9, 8])),
+	("(v* (ivec 1 2) 3)", IntVector([3, 6])),
+	("(v< (ivec 1 5) 3)", List([true, false])),
+])
+def test_elementwise(source, expected):
+	init_evaluator()
+	form, = scan_forms(source)
+	assert evaluate(form) == expected
+
+
+@pytest.mark.parametrize("source", [
+	"(v+ (list 1 2) 3)", "(v+ 1 \"x\")", "(v+ 1 2)", "(v+ (ivec 1) (ivec 1 2))",
+	"(v/ (ivec 1 2) (list 1 2))",
+])
+def test_elementwise_invalid_operands(source):
+	init_evaluator()
+	form, = scan_forms(source)
+	with pytest.raises(errors.ValueError):
+		evaluate(form)
+
+
+def test_mutability_is_kept():
+	init_evaluator()
+	f, g = (evaluate(form) for form in scan_forms(
+			"(let (m (list 1)) (fn () (if m (*recur*))))"
+			"(let (m (mlist 1)) (fn () (if m (*recur*))))"))
+	# Each refers to itself through *recur*.
+	assert not is_mutable(f) and f._mutable is False
+	assert is_mutable(g) and g._mutable is True
+
+	lst = List([Integer(1), List([f])])
+	assert not is_mutable(lst) and lst._mutable is False
+	assert is_mutable(List([lst, g]))
+	# Not kept while it rests on g not being mutable, as g is being checked.
+	inner = List([f])
+	assert not is_mutable(inner, {g}) and inner._mutable is None
+
+
+def test_rest():
+	init_evaluator()
+	lst, mutable, vector = (evaluate(form) for form in scan_forms(
+			"(rest (list 1 2)) (rest (mlist 1 2)) (rest (ivec 1 2))"))
+	assert lst == List([Integer(2)])
+	assert isinstance(mutable, MutableList) and list(mutable) == [Integer(2)]
+	assert vector == IntVector([2])
+	with pytest.raises(errors.ValueError):
+		evaluate(next(scan_forms("(rest 1)")))
+
+
+def test_conj_makes_a_new_list():
+	init_evaluator()
+	m, one, more = (evaluate(form) for form in scan_forms(
+			"(def m (mlist 1 2)) (assoc! (conj m) 0 99) (assoc! (conj m (list 3)) 0 99)"))
+	assert list(m) == [Integer(1), Integer(2)]
+	assert list(one) == [Integer(99), Integer(2)]
+	assert list(more) == [Integer(99), Integer(2), Integer(3)]
@@ -0,0 +1,36 @@
+import io
+
+from jim.objects import *
+from jim.printer import write_form, format_form
+from jim.reader import scan_forms
+
+
+def test_same_as_repr():
+	source = '(f "a\\"b" (g 1 ()) nil (x (y (z))))'
+	form, = scan_forms(source)
+	assert format_form(form, repr) == source
+	assert format_form(form) == str(form)
+	m = Map().assoc(Integer(1), List([Symbol("x")]))
+	assert format_form(List([m, MutableList([true])]), repr) == "({1 (x)} (true))"
+
+
+def test_chunked_writes():
+	class Recorder(io.StringIO):
+		writes = 0
+		def write(self, s):
+			self.writes += 1
+			return super().write(s)
+
+	form = List(List([Integer(i)]) for i in range(5000))
+	out = Recorder()
+	write_form(form, out, repr)
+	assert out.getvalue() == repr(form)
+	assert 1 < out.writes < 100
+
+
+def test_truncation():
+	form, = scan_forms("(a (b (c (d))) 1 2 3)")
+	assert format_form(form, repr, max_depth=2) == "(a (b (...)) 1 2 3)"
+	assert format_form(form, repr, max_length=2) == "(a (b (c (d))) ...)"
+	assert format_form(form, repr, max_depth=0) == "(...)"
+	assert format_form(List(), repr, max_length=0) == "()"
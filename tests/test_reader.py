@@ -1,17 +1,15 @@
 from jim.reader import *
-from jim.ast import *
+from jim.objects import *
 import pytest
 
 
 def dummy_io(string):
 	"""
-	Returns a generator that produces character from the string one at a time
-	then yields empty strings.
+	Returns a reader over the string, producing one character at a time
+	from the source then empty strings.
 	"""
-	for c in string:
-		yield c
-	while True:
-		yield ""
+	chars = iter(string)
+	return Reader(lambda: next(chars, ""))
 
 
 class DummyResult:
@@ -43,44 +41,138 @@ def bad():
 
 
 def test_parse_string():
-	assert good(String("hello")) == parse_string(dummy_io('"hello"'))
-	assert good(String("")) == parse_string(dummy_io('""'))
+	assert good(String("hello")) == dummy_io('"hello"').parse_string()
+	assert good(String("")) == dummy_io('""').parse_string()
 	assert good(String('string "with" escapes'))  \
-			== parse_string(dummy_io(r'"string \"with\" escapes"'))
+			== dummy_io(r'"string \"with\" escapes"').parse_string()
 
-	assert bad() == parse_string(dummy_io('not a string'))
-	assert bad() == parse_string(dummy_io('42'))
-	assert bad() == parse_string(dummy_io('missing open"'))
+	assert bad() == dummy_io('not a string').parse_string()
+	assert bad() == dummy_io('42').parse_string()
+	assert bad() == dummy_io('missing open"').parse_string()
 
 	with pytest.raises(ParseError):
-		parse_string(dummy_io('"not closed'))
+		dummy_io('"not closed').parse_string()
 	with pytest.raises(ParseError):
-		parse_string(dummy_io('"'))
+		dummy_io('"').parse_string()
 
 
 def test_parse_int():
-	assert good(Integer(0)) == parse_integer(dummy_io('0'))
-	assert good(Integer(-5)) == parse_integer(dummy_io('-5'))
-	assert good(Integer(42)) == parse_integer(dummy_io('42'))
-	assert good(Integer(42)) == parse_integer(dummy_io('+42'))
+	assert good(Integer(0)) == dummy_io('0').parse_integer()
+	assert good(Integer(-5)) == dummy_io('-5').parse_integer()
+	assert good(Integer(42)) == dummy_io('42').parse_integer()
+	assert good(Integer(42)) == dummy_io('+42').parse_integer()
 
-	assert bad() == parse_integer(dummy_io('hello'))
-	assert bad() == parse_integer(dummy_io('"a string"'))
+	assert bad() == dummy_io('hello').parse_integer()
+	assert bad() == dummy_io('"a string"').parse_integer()
 
 
 def test_parse_symbol():
-	assert good(Symbol("hello")) == parse_symbol(dummy_io("hello"))
+	assert good(Symbol("hello")) == dummy_io("hello").parse_symbol()
 	# A number can indeed get parsed as a symbol:
 	# this is controlled by parse_form where parse_integer is attempted first.
-	assert good(Symbol("8")) == parse_symbol(dummy_io("8"))
+	assert good(Symbol("8")) == dummy_io("8").parse_symbol()
 
-	assert bad() == parse_symbol(dummy_io('"a string"'))
-	assert bad() == parse_symbol(dummy_io(""))
+	assert bad() == dummy_io('"a string"').parse_symbol()
+	assert bad() == dummy_io("").parse_symbol()
 
 
 def test_parse_comment():
-	assert good(Comment("hello")) == parse_comment(dummy_io(";hello"))
-	assert good(Comment("")) == parse_comment(dummy_io(";"))
-	assert bad() == parse_comment(dummy_io("8"))
-	assert bad() == parse_comment(dummy_io("hi"))
-	assert bad() == parse_comment(dummy_io(""))
+	assert good(Comment("hello")) == dummy_io(";hello").parse_comment()
+	assert good(Comment("")) == dummy_io(";").parse_comment()
+	assert bad() == dummy_io("8").parse_comment()
+	assert bad() == dummy_io("hi").parse_comment()
+	assert bad() == dummy_io("").parse_comment()
+
+
+def test_load_forms():
+	forms = list(load_forms(string_source('(a "b" 1)\n; note\n(c (d))')))
+	assert forms[0] == List([Symbol("a"), String("b"), Integer(1)])
+	assert forms[-1] == List([Symbol("c"), List([Symbol("d")])])
+
+
+def test_comments():
+	source = '; head\n(a ; inner\n b)'
+	assert list(load_forms(string_source(source))) == [List([Symbol("a"), Symbol("b")])]
+	assert list(load_forms(string_source(source), comments=True)) == [
+			Comment(" head"), List([Symbol("a"), Comment(" inner"), Symbol("b")])]
+
+
+def test_parse_error_line():
+	with pytest.raises(ParseError) as e:
+		list(load_forms(string_source('(a)\n(b\n"c')))
+	assert e.value.line == 3
+
+
+def test_long_form_in_chunks():
+	# A form spanning many chunks, with atoms split across them
+	# (the parser backtracks over those), then an error some lines on.
+	source = "(" + "\n".join(f"sym{i} {i} -{i}" for i in range(5000)) + ")\n(a\n)\n)"
+	chunks = (source[i:i + 7] for i in range(0, len(source), 7))
+	forms = iter(Reader(lambda: next(chunks, "")))
+	assert next(forms) == next(scan_forms(source))
+	assert next(forms) == List([Symbol("a")])
+	with pytest.raises(ParseError) as e:
+		next(forms)
+	assert e.value.line == 5003
+
+
+def test_independent_readers():
+	# Interleaving two readers must not mix up positions or line numbers.
+	r1 = iter(Reader(string_source("(a)\n(b)\n(c)")))
+	r2 = Reader(string_source("(x)\n\n\n)"))
+	forms2 = iter(r2)
+	assert next(r1) == List([Symbol("a")])
+	assert next(forms2) == List([Symbol("x")])
+	assert next(r1) == List([Symbol("b")])
+	with pytest.raises(ParseError) as e:
+		next(forms2)
+	assert e.value.line == 4
+	assert next(r1) == List([Symbol("c")])
+
+
+@pytest.mark.parametrize("source", [
+	'(a "b\\"c" 1 -2 +3 4x)\n; note\n(c (d ;inner\n e))',
+	'(a\n (b\n',
+	'(a)\n\n)',
+	'(a\n "open',
+])
+def test_scan_matches_stream(source):
+	def load(forms):
+		try:
+			return list(forms)
+		except ParseError as e:
+			return e.line, e.msg
+	for comments in (False, True):
+		expected = load(load_forms(string_source(source), comments))
+		assert load(scan_forms(source, comments)) == expected
+		assert load(scan_forms(source.encode(), comments)) == expected
+		assert load(load_forms(string_source(source), comments, "scan")) == expected
+
+
+def test_parallel_scan():
+	source = "".join(f'(def x{i} "s(tr" ; ) comment\n (a"b (c {i})))\n' for i in range(50))
+	assert len(top_level_boundaries(source)) == 50
+	expected = list(scan_forms(source))
+	assert list(parallel_scan_forms(source, workers=2, threshold=0)) == expected
+
+	forms = []
+	with pytest.raises(ParseError) as e:
+		for form in parallel_scan_forms(source + "\n)", workers=2, threshold=0):
+			forms.append(form)
+	assert forms == expected
+	assert e.value.line == 102
+
+
+def test_lazy_bodies():
+	source = '(def f (fn (x) (g "(" x) (loop (i) (h i))))\n(f 1)'
+	expected = list(scan_forms(source))
+	forms = list(scan_forms(source, lazy=True))
+
+	fn_form = forms[0][2]
+	assert not isinstance(fn_form[1], LazyList)  # parameters
+	assert [body.is_parsed for body in fn_form[2:]] == [False, False]
+	# Using the loop form parses it, but its own body stays lazy until used.
+	assert fn_form[3][2].is_parsed is False
+	assert forms == expected
+	assert fn_form[3][2].is_parsed
+	assert repr(forms) == repr(expected)
@@ -0,0 +1,54 @@
+import pytest
+
+from jim import reader
+from jim.objects import Integer
+import jim.evaluator.evaluator as evaluator
+from jim.evaluator.common_builtin import function_execution
+import jim.interpreter.evaluator as interpreter
+
+
+@function_execution()
+def StackDepth():
+	return Integer(len(evaluator.stack))
+
+
+def run(engine, source):
+	interpreter.engine = engine
+	evaluator.stack.clear()
+	evaluator.init_evaluator()
+	evaluator.stack[0].context["depth"] = StackDepth()
+	try:
+		for form in reader.scan_forms(source):
+			result = interpreter.evaluate(form)
+	finally:
+		interpreter.engine = "tree"
+	return result
+
+
+@pytest.mark.parametrize("engine", ["tree", "vm"])
+def test_loop_in_constant_stack(engine):
+	# The depth seen on the first iteration and on the last.
+	source = """
+		(def n 0) (def first 0) (def last 0)
+		(loop (n first last)
+			(let (d (depth))
+				(if (= n 0)
+					(*recur* 1 d d)
+					(if (< n 20000)
+						(progn (*recur* (+ n 1) first d))
+						(list first last n)))))"""
+	first, last, n = run(engine, source)
+	assert n == Integer(20000) and first == last
+
+
+@pytest.mark.parametrize("engine", ["tree", "vm"])
+@pytest.mark.parametrize("recur", [
+	"(*recur* (+ n 1) (+ total n))",
+	# Not a tail call.
+	"(progn (*recur* (+ n 1) (+ total n)) nil)"])
+def test_loop_variables(engine, recur):
+	source = f"""
+		(def n 0) (def total 0)
+		(loop (n total) (if (< n 100) {recur} nil))
+		(list n total)"""
+	assert list(run(engine, source)) == [Integer(100), Integer(4950)]
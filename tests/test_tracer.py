@@ -0,0 +1,70 @@
+import json
+
+import pytest
+
+import jim.tracer as tracer
+import jim.evaluator.evaluator as evaluator
+from jim.evaluator.evaluator import init_evaluator
+from jim.evaluator.errors import JimmyError
+import jim.interpreter.evaluator as interpreter
+from jim.interpreter.evaluator import evaluate
+from jim.objects import Symbol
+from jim.reader import scan_forms
+
+
+def test_ring_buffer(tmp_path):
+	init_evaluator()
+	form, = scan_forms("(+ 1 (* 2 (- 5 2)))")
+	tracer.enable(size=4)
+	try:
+		result = evaluate(form)
+		kinds = [e[1] for e in tracer.events]
+		assert kinds == [tracer.PUSH, tracer.POP, tracer.POP, tracer.POP]
+		assert tracer.events[-1][3:] == (form, result)
+
+		tracer.dump(str(tmp_path / "trace.txt"))
+		lines = (tmp_path / "trace.txt").read_text().splitlines()
+		assert len(lines) == 4 and lines[-1].endswith("(+ 1 (* 2 (- 5 2))) -> 7")
+
+		tracer.dump(str(tmp_path / "trace.json"))
+		trace = json.loads((tmp_path / "trace.json").read_text())
+		assert [e["ph"] for e in trace["traceEvents"]] == ["B", "E", "E", "E"]
+	finally:
+		tracer.disable()
+
+
+def traced(engine, source):
+	"""
+	The kind, depth and form of the events recorded evaluating source,
+	up to an error if one is raised.
+	"""
+	evaluator.stack.clear()
+	init_evaluator()
+	interpreter.engine = engine
+	tracer.enable()
+	try:
+		for form in scan_forms(source):
+			evaluate(form)
+	except JimmyError:
+		pass
+	finally:
+		events = [e[1:4] for e in tracer.events]
+		tracer.disable()
+		interpreter.engine = "tree"
+	return events
+
+
+def test_vm_records_frames():
+	source = "(def f (fn (x) (* x (+ x 1)))) (let (a 2) (list (f a) (- a)))"
+	assert traced("vm", source) == traced("tree", source)
+
+	events = traced("vm", "(def f (fn (x) (+ x y))) (f 1)")
+	call, body = scan_forms("(f 1) (+ x y)")
+	assert events[-6:] == [
+		(tracer.PUSH, 2, call),
+		(tracer.PUSH, 3, Symbol("y")),
+		(tracer.THROW, 3, Symbol("y")),
+		(tracer.POP, 3, Symbol("y")),
+		# The frame of the call, which evaluated the body in place.
+		(tracer.THROW, 2, body),
+		(tracer.POP, 2, body)]
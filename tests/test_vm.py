@@ -0,0 +1,61 @@
+import re
+import pytest
+
+from jim import reader
+import jim.evaluator.evaluator as evaluator
+from jim.evaluator.errors import JimmyError, format_error
+import jim.interpreter.evaluator as interpreter
+
+
+PROGRAMS = [
+	"(def x 4) (if (< x 5) (+ x 1) (undefined))",
+	"(def f (fn (x (y 2) (more)) (list x y more))) (f 1) (f 1 2 3 4) (apply f (list 5))",
+	"(def n 0) (loop (n) (if (< n 10) (*recur* (+ n 1)) n))",
+	"(def if (fn (a b c) (list c b a))) (if 1 2 3)",
+	"(def g (fn (x) (postcond (< *result* 3) (let (y (+ x 1)) y)))) (g 1) (invar true (g 1))",
+	"(def f (fn (x) (if (< x 1) (+ x \"a\") (*recur* (- x 1))))) (f 3)",
+	"(let (z (* 2 3)) (progn (print z) (if z 1 2)))",
+	"(def n 0) (loop (n) (if (< n 3) (*recur* (+ n 1)) (missing n)))",
+	"((fn (x) (* x x)) 7) (def q) (progn) (5 1 2)",
+	"(def f (fn (a b) a)) (f 1)",
+	"(/ 5 0)",
+	# Lookups cached by the engine, invalidated by assignments.
+	"(def x 1) (def n 0) (def r (list)) (loop (n r) (if (< n 3) (progn (def x (+ x 1)) (*recur* (+ n 1) (conj r (list x)))) r))",
+	"(def mk (fn (k) (fn (x) (+ x k)))) (def a (mk 1)) (def b (mk 10)) (list (a 1) (b 1) (a 2) (b 2))",
+	"(def n 0) (loop (n) (if (< n 2) (let (n 5) (*recur* (+ n 1))) n))",
+	"(def n 0) (def r (list)) (loop (n r) (if (< n 3) (progn (def if (fn (a b c) c)) (*recur* (+ n 1) (conj r (list (if true 1 2))))) r))",
+	"(def n 0) (def t 0) (loop (n) (if (< n 3) (progn (loop (t) (if (< t n) (*recur* (+ t 1)))) (*recur* (+ n 1))))) (list n t)",
+	# A call defining x reaches the same lookup after one that does not.
+	"(def x 1) (def f (fn (n) (if (> n 0) (progn (def x 5) (*recur* (- n 1)))) x)) (f 1)",
+	# The same form in different scopes, when read as one shared object.
+	"(def a 100) (def x 5) (def f (fn (x) (let (b 0) (+ a x)))) (def g (fn (y) (let (a y) (+ a x)))) (f 1) (g 7)",
+]
+
+
+def run(engine, source, share):
+	interpreter.engine = engine
+	evaluator.stack.clear()
+	evaluator.init_evaluator()
+	results = []
+	try:
+		for form in reader.scan_forms(source, share=share):
+			results.append(interpreter.evaluate(form))
+	except JimmyError as e:
+		results.append(format_error(e))
+	finally:
+		interpreter.engine = "tree"
+	return results
+
+
+@pytest.mark.parametrize("share", [False, True])
+@pytest.mark.parametrize("source", PROGRAMS)
+def test_same_as_tree(source, share, capsys):
+	tree = run("tree", source, share)
+	tree_output = capsys.readouterr()
+	vm = run("vm", source, share)
+	# User executions are printed with their address,
+	# and unknown values are numbered as they are created.
+	def text(results):
+		return [re.sub("0x[0-9a-f]+|unk[0-9]+", "?", str(r)) for r in results]
+	assert text(vm) == text(tree)
+	assert capsys.readouterr() == tree_output